@@ -1,8 +1,20 @@
-from fastapi import FastAPI, UploadFile, File, Header, HTTPException
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, Depends, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
+from tempfile import NamedTemporaryFile
+import asyncio
+import json
 import os
+import time
 from typing import Optional
+from utils.jobs import Job, JobManager, QueueFullError
+from utils.uploads import UploadError, UploadManager, UploadSession
+from utils.openai_client import init_openai, get_rate_limit_stats
+from utils.processing import process_audio_source, audio_run_id
+from utils.checkpoint import RunManifest
+from utils.metrics import render_prometheus
+from config.settings import CHAT_MODEL
 
 app = FastAPI()
 
@@ -19,32 +31,238 @@ app.add_middleware(
 API_KEY = os.getenv("API_KEY", "your-api-key")  # 請更改為安全的 API 金鑰
 api_key_header = APIKeyHeader(name="X-API-Key")
 
-@app.post("/api/v1/process_audio")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+UPLOAD_BLOCK = 1024 * 1024
+SSE_KEEPALIVE = 15  # 沒有新事件時送出註解行的間隔秒數，避免代理伺服器中斷連線
+
+# 解碼與轉錄在背景工作執行緒中進行（ffmpeg 解碼與編碼在獨立程序中執行），不會阻塞事件迴圈
+jobs = JobManager()
+uploads = UploadManager()
+
+def verify_api_key(x_api_key: str = Header(None)):
+    # 驗證 API 金鑰
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+def get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def get_upload(upload_id: str) -> UploadSession:
+    session = uploads.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+def run_audio_job(job: Job, source, system_prompt: str, model: str) -> dict:
+    """背景工作：處理音檔路徑或上傳中的檔案物件"""
+    client = init_openai(OPENAI_API_KEY)
+    # 相同檔案重新送出時從檢查點繼續
+    run_id = audio_run_id(source)
+    manifest = RunManifest(run_id) if run_id else None
+    results = process_audio_source(
+        client, source, system_prompt, model, on_stage=job.update_stage, manifest=manifest,
+        on_token=lambda stage, token: job.publish("token", stage=stage, text=token)
+    )
+    job.artifacts = results['artifacts']
+    return {
+        "transcript": results['transcript'],
+        "summary_en": results['summary_en'],
+        "summary_zh": results['translation_zh'],
+        "key_points": results['key_points'].split('\n'),
+        "srt_content": results['srt_content'],
+        "speech_trim": results['speech_trim'],
+        "artifacts": artifact_list(job)
+    }
+
+def artifact_list(job: Job) -> list:
+    return [
+        {"name": name, "filename": job.artifacts.spec(name).filename, "url": f"/api/v1/jobs/{job.id}/artifacts/{name}"}
+        for name in job.artifacts.names()
+    ]
+
+def submit_audio_job(source, system_prompt: str, model: str, cleanup, streaming: bool = False) -> Job:
+    """cleanup 在工作結束後以 Job 呼叫；工作被拒絕時以 None 呼叫"""
+    if jobs.queued() >= jobs.max_queue:
+        cleanup(None)
+        raise HTTPException(status_code=503, detail="Too many queued jobs", headers={"Retry-After": "30"})
+    try:
+        return jobs.submit(run_audio_job, source, system_prompt or "", model, on_done=cleanup, streaming=streaming)
+    except QueueFullError as e:
+        cleanup(None)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+def submit_upload_job(session: UploadSession, system_prompt: str, model: str) -> Job:
+    """
+    為上傳建立處理工作；上傳尚未完成時邊收邊處理，並在獨立的執行緒池中等待資料
+    檢查點以上傳編號為鍵，工作失敗後保留上傳，重新送出時從檢查點繼續
+    """
+    def cleanup(job: Optional[Job]):
+        if job is not None and job.status == "succeeded":
+            uploads.remove(session.id)
+        else:
+            session.job_id = None
+            session.updated = time.time()
+
+    job = submit_audio_job(
+        session.reader(), system_prompt, model, cleanup=cleanup, streaming=not session.complete
+    )
+    session.job_id = job.id
+    if job.status == "failed":
+        # 工作在設定 job_id 之前就已失敗
+        session.job_id = None
+    return job
+
+def accepted(job: Job) -> dict:
+    return {
+        "status": "accepted",
+        "job_id": job.id,
+        "status_url": f"/api/v1/jobs/{job.id}",
+        "result_url": f"/api/v1/jobs/{job.id}/result"
+    }
+
+@app.post("/api/v1/process_audio", status_code=202, dependencies=[Depends(verify_api_key)])
 async def process_audio(
     file: UploadFile = File(...),
     system_prompt: Optional[str] = "",
-    x_api_key: str = Header(None)
+    model: str = CHAT_MODEL
 ):
-    # 驗證 API 金鑰
-    if x_api_key != API_KEY:
-        raise HTTPException(status_code=403, detail="Invalid API key")
+    # 將上傳內容分塊寫入暫存檔，交給背景工作處理
+    suffix = os.path.splitext(file.filename or "")[1]
+    with NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        while block := await file.read(UPLOAD_BLOCK):
+            f.write(block)
+        path = f.name
+
+    job = submit_audio_job(path, system_prompt, model, cleanup=lambda job: os.unlink(path))
+    return accepted(job)
+
+@app.post("/api/v1/uploads", status_code=201, dependencies=[Depends(verify_api_key)])
+async def create_upload(
+    filename: str = "",
+    total_size: Optional[int] = None,
+    system_prompt: Optional[str] = "",
+    model: str = CHAT_MODEL,
+    process: bool = True
+):
+    """
+    建立可續傳的上傳；process 為 True 時立即建立處理工作，
+    解碼與轉錄會在後續位元組仍在上傳時就開始；否則之後以 /process 開始處理
+    """
+    session = uploads.create(filename, total_size)
+    if process:
+        submit_upload_job(session, system_prompt, model)
+    return session.to_dict()
 
+@app.get("/api/v1/uploads/{upload_id}", dependencies=[Depends(verify_api_key)])
+async def upload_status(upload_id: str):
+    """查詢已收到的位元組數，中斷後從此位移續傳"""
+    return get_upload(upload_id).to_dict()
+
+@app.put("/api/v1/uploads/{upload_id}", dependencies=[Depends(verify_api_key)])
+async def append_upload(upload_id: str, request: Request, offset: int = 0, final: bool = False):
+    """以串流方式將請求本文附加到上傳位移 offset；final 為 True 表示上傳完成"""
+    session = get_upload(upload_id)
+    position = offset
     try:
-        # ... (原有的音檔處理邏輯) ...
-        
-        return {
-            "status": "success",
-            "data": {
-                "transcript": transcript,
-                "summary_en": processed_transcript,
-                "summary_zh": processed_transcript_ch,
-                "key_points": processed_summary,
-                "srt_content": srt_content
-            }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        async for block in request.stream():
+            if block:
+                session.write(position, block)
+                position += len(block)
+    except UploadError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(session.size)})
+    if final:
+        session.finish()
+    return session.to_dict()
+
+@app.post("/api/v1/uploads/{upload_id}/complete", dependencies=[Depends(verify_api_key)])
+async def complete_upload(upload_id: str):
+    session = get_upload(upload_id)
+    session.finish()
+    return session.to_dict()
+
+@app.post("/api/v1/uploads/{upload_id}/process", status_code=202, dependencies=[Depends(verify_api_key)])
+async def process_upload(upload_id: str, system_prompt: Optional[str] = "", model: str = CHAT_MODEL):
+    """為已完成或仍在上傳中的檔案建立處理工作；先前的工作失敗後可再次送出，從檢查點繼續"""
+    session = get_upload(upload_id)
+    if session.job_id is not None:
+        raise HTTPException(status_code=409, detail="Upload is already being processed")
+    return accepted(submit_upload_job(session, system_prompt, model))
+
+@app.get("/api/v1/jobs/{job_id}", dependencies=[Depends(verify_api_key)])
+async def job_status(job_id: str):
+    return get_job(job_id).to_dict()
+
+@app.get("/api/v1/jobs/{job_id}/events", dependencies=[Depends(verify_api_key)])
+async def job_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    以 Server-Sent Events 推送工作進度：stage（階段狀態）、token（翻譯與摘要的模型輸出片段）、status
+    斷線後以 Last-Event-ID 標頭重新連線，從下一筆仍保留的事件繼續；工作結束後不再保留 token 事件
+    """
+    job = get_job(job_id)
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        index = start
+        while True:
+            events, finished = await asyncio.to_thread(job.wait_events, index, SSE_KEEPALIVE)
+            for event_id, event in events:
+                data = {key: value for key, value in event.items() if key != "event"}
+                yield f"id: {event_id}\nevent: {event['event']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                index = event_id + 1
+            if finished and not events:
+                yield f"event: done\ndata: {json.dumps({'status': job.status, 'result_url': f'/api/v1/jobs/{job.id}/result'})}\n\n"
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/v1/jobs/{job_id}/result", dependencies=[Depends(verify_api_key)])
+async def job_result(job_id: str):
+    job = get_job(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return {
+        "status": "success",
+        "data": job.result
+    }
+
+@app.get("/api/v1/jobs/{job_id}/artifacts", dependencies=[Depends(verify_api_key)])
+async def job_artifacts(job_id: str):
+    job = get_job(job_id)
+    if job.artifacts is None:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return {"artifacts": artifact_list(job)}
+
+@app.get("/api/v1/jobs/{job_id}/artifacts/{name}", dependencies=[Depends(verify_api_key)])
+async def download_artifact(job_id: str, name: str, if_none_match: Optional[str] = Header(None)):
+    """下載單一產出檔；第一次請求時才格式化，之後直接回傳記住的內容，內容雜湊作為 ETag"""
+    job = get_job(job_id)
+    if job.artifacts is None:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    try:
+        spec = job.artifacts.spec(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    etag = f'"{await asyncio.to_thread(job.artifacts.key, name)}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    data = await asyncio.to_thread(job.artifacts.data, name)
+    return Response(data, media_type=f"{spec.mime_type}; charset=utf-8", headers={
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="{spec.filename}"',
+    })
 
 @app.get("/api/v1/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy", "queued_jobs": jobs.queued(), "rate_limits": get_rate_limit_stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 格式的各階段耗時、資料量、權杖用量、重試與快取命中統計"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,158 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import default
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+
+class FakeDriveServer:
+    """
+    本機的 Google Drive v3 替身：支援資料夾查詢、單一請求上傳與續傳分塊上傳
+    每個請求加上固定延遲，用來量測匯出是否並行
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2):
+        self.latency = latency
+        self.files: Dict[str, dict] = {}
+        self.calls = Counter()
+        self._sessions: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/drive/v3/"
+
+    def start(self) -> "FakeDriveServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create(self, metadata: dict, data: bytes = b"") -> dict:
+        file_id = uuid.uuid4().hex
+        entry = {
+            "id": file_id,
+            "name": metadata.get("name"),
+            "mimeType": metadata.get("mimeType"),
+            "parents": metadata.get("parents", []),
+            "size": len(data),
+            "webViewLink": f"https://drive.example/{file_id}",
+        }
+        with self._lock:
+            self.files[file_id] = entry
+        return entry
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload=None, headers: Dict[str, str] = None):
+                data = json.dumps(payload).encode('utf-8') if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _count(self, name: str):
+                time.sleep(server.latency)
+                with server._lock:
+                    server.calls[name] += 1
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/drive/v3/files":
+                    self._send(404, {"error": "not found"})
+                    return
+                self._count("list")
+                query = parse_qs(url.query).get("q", [""])[0]
+                name = re.search(r"name='((?:[^'\\]|\\.)*)'", query)
+                with server._lock:
+                    found = [
+                        {"id": entry["id"]} for entry in server.files.values()
+                        if name and entry["name"] == name.group(1).replace("\\'", "'")
+                        and entry["mimeType"] == "application/vnd.google-apps.folder"
+                    ]
+                self._send(200, {"files": found})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                upload_type = parse_qs(url.query).get("uploadType", [""])[0]
+                body = self._body()
+                if url.path == "/drive/v3/files":
+                    self._count("create")
+                    self._send(200, server._create(json.loads(body)))
+                elif url.path == "/upload/drive/v3/files" and upload_type == "multipart":
+                    self._count("multipart")
+                    message = BytesParser(policy=default).parsebytes(
+                        f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+                    )
+                    parts = list(message.iter_parts())
+                    metadata = json.loads(parts[0].get_content())
+                    self._send(200, server._create(metadata, parts[1].get_payload(decode=True)))
+                elif url.path == "/upload/drive/v3/files" and upload_type == "resumable":
+                    self._count("resumable_start")
+                    session = uuid.uuid4().hex
+                    with server._lock:
+                        server._sessions[session] = {"metadata": json.loads(body or b"{}"), "data": bytearray()}
+                    host, port = server._server.server_address[:2]
+                    self._send(200, None, {"Location": f"http://{host}:{port}/upload/session/{session}"})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_PUT(self):
+                match = re.fullmatch(r"/upload/session/(\w+)", urlparse(self.path).path)
+                body = self._body()
+                with server._lock:
+                    session = server._sessions.get(match.group(1)) if match else None
+                if session is None:
+                    self._send(404, {"error": "not found"})
+                    return
+                self._count("resumable_chunk")
+                session["data"].extend(body)
+                total = self.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+                if total != "*" and len(session["data"]) >= int(total):
+                    with server._lock:
+                        server._sessions.pop(match.group(1), None)
+                    self._send(200, server._create(session["metadata"], bytes(session["data"])))
+                else:
+                    self._send(308, None, {"Range": f"bytes=0-{len(session['data']) - 1}"})
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="啟動本機的 Google Drive API 替身伺服器")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    server = FakeDriveServer(port=args.port, latency=args.latency).start()
+    print(f"WHISPER_DRIVE_ENDPOINT={server.endpoint}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
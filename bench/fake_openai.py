@@ -0,0 +1,239 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter, deque
+from typing import Optional
+import argparse
+import json
+import random
+import threading
+import time
+
+SENTENCE = "This is sentence {n} of the synthetic benchmark lecture about clinical care."
+
+def classify_chat(prompt: str) -> str:
+    """依提示內容判斷呼叫屬於哪個處理階段"""
+    if prompt.startswith("Translate"):
+        return "translation"
+    if prompt.startswith("Summarize the following section"):
+        return "summary_map"
+    if prompt.startswith("Combine the following summaries"):
+        return "summary_merge"
+    if "10 key points" in prompt:
+        return "key_points"
+    if prompt.startswith("Please summarize"):
+        return "summary"
+    return "chat"
+
+class FakeOpenAIServer:
+    """
+    本機的 OpenAI 替身，提供轉錄與聊天完成端點
+    可設定延遲、抖動、錯誤率與每分鐘請求上限，並統計各階段的呼叫次數與上傳位元組數
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.5,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        rpm: Optional[int] = None,
+        segment_seconds: float = 10.0,
+        words_per_reply: int = 200,
+        token_interval: float = 0.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.segment_seconds = segment_seconds
+        self.words_per_reply = words_per_reply
+        self.token_interval = token_interval
+        self.calls = Counter()
+        self.errors = Counter()
+        self.bytes_uploaded = 0
+        self._recent = deque()
+        self._sentence = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "bytes_uploaded": self.bytes_uploaded,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.errors.clear()
+            self.bytes_uploaded = 0
+
+    def _throttled(self) -> bool:
+        """以一分鐘滑動視窗模擬速率限制"""
+        if not self.rpm:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0] < now - 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.rpm:
+                return True
+            self._recent.append(now)
+            return False
+
+    def _sentences(self, count: int) -> str:
+        with self._lock:
+            start = self._sentence
+            self._sentence += count
+        return " ".join(SENTENCE.format(n=n) for n in range(start, start + count))
+
+    def _transcription(self, size: int) -> dict:
+        # 以上傳大小粗估片段長度：16 kHz 單聲道 FLAC 約每秒 16 KB
+        duration = max(1.0, size / 16000)
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + self.segment_seconds)
+            segments.append({"id": len(segments), "start": start, "end": end, "text": " " + self._sentences(2)})
+            start = end
+        return {
+            "text": "".join(segment["text"] for segment in segments).strip(),
+            "language": "english",
+            "duration": duration,
+            "segments": segments,
+        }
+
+    def _completion(self, body: dict) -> dict:
+        prompt = body["messages"][-1]["content"]
+        content = " ".join(["word"] * self.words_per_reply)
+        prompt_tokens = len(prompt) // 4
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "bench"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": self.words_per_reply,
+                "total_tokens": prompt_tokens + self.words_per_reply,
+            },
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: Optional[dict] = None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self._send(200, server.stats())
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.endswith("/audio/transcriptions"):
+                    stage = "transcription"
+                    with server._lock:
+                        server.bytes_uploaded += len(body)
+                elif self.path.endswith("/chat/completions"):
+                    request = json.loads(body)
+                    stage = classify_chat(request["messages"][-1]["content"])
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+
+                time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+                if server._throttled():
+                    with server._lock:
+                        server.errors[f"{stage}:429"] += 1
+                    self._send(429, {"error": {"message": "rate limited", "type": "rate_limit"}}, {"Retry-After": "1"})
+                    return
+                if random.random() < server.error_rate:
+                    with server._lock:
+                        server.errors[f"{stage}:500"] += 1
+                    self._send(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                    return
+
+                with server._lock:
+                    server.calls[stage] += 1
+                if stage == "transcription":
+                    self._send(200, server._transcription(len(body)))
+                elif request.get("stream"):
+                    self._stream(server._completion(request))
+                else:
+                    self._send(200, server._completion(request))
+
+            def _stream(self, completion: dict):
+                """以 Server-Sent Events 逐字回傳，每個字之間間隔 token_interval 秒"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                words = completion["choices"][0]["message"]["content"].split(" ")
+                base = {key: completion[key] for key in ("id", "created", "model")}
+                for i, word in enumerate(words):
+                    delta = {"content": word if i == 0 else " " + word}
+                    chunk = dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(server.token_interval)
+                usage = dict(base, object="chat.completion.chunk", choices=[], usage=completion["usage"])
+                self.wfile.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="啟動本機的 OpenAI 替身伺服器")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=None)
+    args = parser.parse_args()
+    server = FakeOpenAIServer(
+        port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, rpm=args.rpm
+    ).start()
+    print(f"OPENAI_BASE_URL={server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
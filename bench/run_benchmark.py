@@ -0,0 +1,140 @@
+from typing import List
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from bench.fake_openai import FakeOpenAIServer
+
+# 以語音般的節奏產生合成音訊：每 7 秒有 1.5 秒靜音，供切割點偵測使用
+SYNTHETIC_EXPR = "0.3*sin(2*PI*220*t)*(0.6+0.4*sin(2*PI*3*t))*gt(mod(t\\,7)\\,1.5)"
+
+def make_synthetic_audio(path: str, minutes: float, sample_rate: int = 44100):
+    """以 ffmpeg 產生指定長度的合成音檔"""
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"aevalsrc={SYNTHETIC_EXPR}:s={sample_rate}:d={minutes * 60}",
+            "-ac", "2", "-c:a", "libmp3lame", "-b:a", "64k", path
+        ],
+        check=True
+    )
+
+def run_case(path: str, env: dict, workers: int, results):
+    """在獨立程序中處理一個音檔，使峰值記憶體可分別量測"""
+    os.environ.update(env)
+    from utils.openai_client import init_openai, get_rate_limit_stats
+    from utils.processing import process_audio_source
+    from utils.metrics import timing_breakdown
+
+    finished = {}
+    client = init_openai(env['OPENAI_API_KEY'])
+    start = time.perf_counter()
+
+    def on_stage(name, status, **details):
+        # 管線階段只回報完成事件，因此記錄各階段相對於開始時間的完成時刻
+        if status == 'done':
+            finished[name] = round(time.perf_counter() - start, 3)
+
+    output = process_audio_source(client, path, max_workers=workers, on_stage=on_stage)
+    wall = time.perf_counter() - start
+
+    results.put({
+        "wall_seconds": round(wall, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        # ffmpeg 解碼在子程序中進行，其記憶體不計入上面的數字；此為已結束子程序中最大的峰值
+        "peak_rss_children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "stage_finished_at": finished,
+        "stage_seconds": {
+            stage: {"calls": count, "seconds": round(seconds, 3)}
+            for stage, count, seconds in timing_breakdown({})
+        },
+        "transcript_chars": len(output['transcript']),
+        "segments": len(output['segments']),
+        "speech_trim": output['speech_trim'],
+        "rate_limits": get_rate_limit_stats(),
+    })
+
+def run_benchmark(durations: List[float], args) -> dict:
+    server = FakeOpenAIServer(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, rpm=args.server_rpm
+    ).start()
+    context = multiprocessing.get_context("spawn")
+    cases = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="whisper-bench-") as workdir:
+            for minutes in durations:
+                path = os.path.join(workdir, f"synthetic-{minutes:g}min.mp3")
+                make_synthetic_audio(path, minutes)
+                env = {
+                    "OPENAI_API_KEY": "bench",
+                    "OPENAI_BASE_URL": server.base_url,
+                    # 每個案例使用全新的快取目錄，避免命中先前的結果
+                    "WHISPER_CACHE_DIR": os.path.join(workdir, f"cache-{minutes:g}"),
+                    "WHISPER_RPM": str(args.whisper_rpm),
+                    "CHAT_RPM": str(args.chat_rpm),
+                    "CHAT_TPM": str(args.chat_tpm),
+                }
+                server.reset()
+                results = context.Queue()
+                process = context.Process(target=run_case, args=(path, env, args.workers, results))
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    raise RuntimeError(f"{minutes:g} 分鐘案例失敗 (exit code {process.exitcode})")
+                case = {"duration_minutes": minutes, "input_bytes": os.path.getsize(path)}
+                case.update(results.get())
+                case.update(server.stats())
+                cases.append(case)
+                print(f"{minutes:g} min: {case['wall_seconds']}s, {case['peak_rss_mb']} MB (ffmpeg {case['peak_rss_children_mb']} MB)", file=sys.stderr)
+    finally:
+        server.stop()
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "server_rpm": args.server_rpm,
+            "workers": args.workers,
+            "whisper_rpm": args.whisper_rpm,
+            "chat_rpm": args.chat_rpm,
+            "chat_tpm": args.chat_tpm,
+        },
+        "cases": cases,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="以本機 OpenAI 替身執行端到端效能測試")
+    parser.add_argument("--durations", default="1,10,60,180", help="以逗號分隔的音檔長度（分鐘）")
+    parser.add_argument("--latency", type=float, default=0.5, help="每次呼叫的平均延遲（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延遲的隨機抖動範圍（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回傳 500 錯誤的比例")
+    parser.add_argument("--server-rpm", type=int, default=None, help="替身伺服器每分鐘請求上限，超過回傳 429")
+    parser.add_argument("--workers", type=int, default=4, help="並行轉錄數")
+    parser.add_argument("--whisper-rpm", type=int, default=600)
+    parser.add_argument("--chat-rpm", type=int, default=600)
+    parser.add_argument("--chat-tpm", type=int, default=10_000_000)
+    parser.add_argument("--output", default="bench_output.json", help="JSON 結果輸出檔")
+    args = parser.parse_args()
+
+    durations = [float(value) for value in args.durations.split(",") if value.strip()]
+    report = run_benchmark(durations, args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
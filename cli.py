@@ -0,0 +1,263 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from utils.audio_encoder import EncodedChunk, encode_chunk
+from utils.audio_stream import stream_audio_chunks
+from utils.checkpoint import RunManifest
+from utils.live import LiveTranscriber, LIVE_ARTIFACTS, follow_pcm, replay_pcm
+from utils.openai_client import init_openai, set_max_concurrency
+from utils.processing import process_audio_source, audio_run_id, make_trimmer
+from utils.speech_trim import OffsetMap
+from utils.subtitle_generator import format_time, write_subtitles
+from config.settings import (
+    AUDIO_CODEC, CHAT_MODEL, BATCH_EXTENSIONS, BATCH_DECODE_WORKERS, BATCH_API_CONCURRENCY
+)
+
+# 產出檔名後綴：與輸入檔放在同一目錄，例如 lecture.mp3 -> lecture.zh.txt
+ARTIFACTS = {
+    'transcript': '.transcript.txt',
+    'translation_zh': '.zh.txt',
+    'summary_en': '.summary.txt',
+    'key_points': '.key_points.txt',
+    'bilingual_srt': '.bilingual.srt',
+    'srt': '.en.srt',
+    'vtt': '.en.vtt',
+}
+MARKER_SUFFIX = '.whisper.json'  # 所有產出寫完後才建立，作為完成標記
+
+ChunkFile = Tuple[int, str, int, str]  # (位移毫秒, 暫存檔路徑, 原始 PCM 大小, 上傳檔名)
+
+def find_inputs(patterns: List[str], recursive: bool = False) -> List[str]:
+    """展開目錄、萬用字元與檔案路徑，回傳排序後的音檔清單"""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                candidates = (
+                    os.path.join(root, name)
+                    for root, _, names in os.walk(pattern) for name in names
+                )
+            else:
+                candidates = (os.path.join(pattern, name) for name in os.listdir(pattern))
+        else:
+            candidates = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(BATCH_EXTENSIONS):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+def output_base(path: str) -> str:
+    return os.path.splitext(path)[0]
+
+def source_info(path: str, system_prompt: str, model: str) -> dict:
+    stat = os.stat(path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "system_prompt": system_prompt,
+        "model": model,
+    }
+
+def is_complete(path: str, system_prompt: str, model: str) -> bool:
+    """完成標記存在、輸入檔與設定未變更，且所有產出檔都在時視為已完成"""
+    base = output_base(path)
+    try:
+        with open(base + MARKER_SUFFIX, encoding='utf-8') as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if marker.get("source") != source_info(path, system_prompt, model):
+        return False
+    return all(os.path.exists(base + suffix) for suffix in ARTIFACTS.values())
+
+def _write_atomic(path: str, write):
+    """先寫入暫存檔再改名，中斷時不會留下寫到一半的產出"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp, path)
+
+def write_outputs(path: str, results: dict, system_prompt: str, model: str, elapsed: float):
+    base = output_base(path)
+    texts = {
+        'transcript': results['transcript'],
+        'translation_zh': results['translation_zh'],
+        'summary_en': results['summary_en'],
+        'key_points': results['key_points'],
+        'bilingual_srt': results['srt_content'],
+    }
+    for name, text in texts.items():
+        _write_atomic(base + ARTIFACTS[name], lambda f, text=text: f.write(text))
+    segments = results['segments']
+    _write_atomic(base + ARTIFACTS['srt'], lambda f: write_subtitles(segments, f, "srt"))
+    _write_atomic(base + ARTIFACTS['vtt'], lambda f: write_subtitles(segments, f, "vtt"))
+    marker = {
+        "source": source_info(path, system_prompt, model),
+        "artifacts": [os.path.basename(base + suffix) for suffix in ARTIFACTS.values()],
+        "duration": segments.duration,
+        "speech_trim": results['speech_trim'],
+        "elapsed": round(elapsed, 1),
+    }
+    _write_atomic(base + MARKER_SUFFIX, lambda f: json.dump(marker, f, ensure_ascii=False, indent=2))
+
+def prepare_audio(path: str, spool_dir: str, codec: str = AUDIO_CODEC) -> Tuple[List[ChunkFile], Optional[OffsetMap]]:
+    """
+    在解碼程序中執行：串流解碼、移除長靜音、在靜音處切割並編碼，片段寫入暫存目錄
+    只回傳檔案路徑與時間軸對應，避免在程序間傳遞大量音訊資料
+    """
+    trimmer = make_trimmer()
+    chunk_files = []
+    for index, (offset_ms, chunk) in enumerate(stream_audio_chunks(path, trimmer=trimmer)):
+        encoded = encode_chunk(chunk, codec=codec)
+        chunk_path = os.path.join(spool_dir, f"{index:05d}.{encoded.filename.rsplit('.', 1)[-1]}")
+        with open(chunk_path, "wb") as f:
+            f.write(encoded.data)
+        chunk_files.append((offset_ms, chunk_path, encoded.raw_bytes, encoded.filename))
+    return chunk_files, trimmer.offsets if trimmer is not None else None
+
+def load_chunks(chunk_files: List[ChunkFile]) -> Iterator[Tuple[int, EncodedChunk]]:
+    """逐一讀回已編碼的片段，同時在記憶體中的片段數由轉錄端控制"""
+    for offset_ms, chunk_path, raw_bytes, filename in chunk_files:
+        with open(chunk_path, "rb") as f:
+            data = f.read()
+        yield offset_ms, EncodedChunk(data, filename, raw_bytes, len(data))
+
+def process_file(client, decode_pool, path: str, system_prompt: str, model: str, max_workers: int) -> float:
+    start = time.perf_counter()
+    spool_dir = tempfile.mkdtemp(prefix="whisper-batch-")
+    try:
+        chunk_files, offsets = decode_pool.submit(prepare_audio, path, spool_dir).result()
+        # 與網頁介面共用檢查點：中斷後重新執行只轉錄尚未完成的片段
+        manifest = RunManifest(audio_run_id(path))
+        results = process_audio_source(
+            client, path, system_prompt, model,
+            max_workers=max_workers, manifest=manifest, chunks=load_chunks(chunk_files), offsets=offsets
+        )
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    write_outputs(path, results, system_prompt, model, elapsed)
+    return elapsed
+
+def run_batch(
+    paths: List[str],
+    api_key: str,
+    system_prompt: str = "",
+    model: str = CHAT_MODEL,
+    decode_workers: int = BATCH_DECODE_WORKERS,
+    api_concurrency: int = BATCH_API_CONCURRENCY,
+    files_in_flight: Optional[int] = None,
+    force: bool = False
+) -> int:
+    """處理所有音檔並回傳失敗的檔案數"""
+    pending = [path for path in paths if force or not is_complete(path, system_prompt, model)]
+    for path in sorted(set(paths) - set(pending)):
+        print(f"略過（已完成）：{path}", file=sys.stderr)
+    if not pending:
+        return 0
+
+    # 所有檔案共用一個客戶端、一組速率限制與同時呼叫上限
+    set_max_concurrency(api_concurrency)
+    client = init_openai(api_key)
+    # 同時處理的檔案比解碼程序多一個，讓下一個檔案在前一個等待 API 時就開始解碼
+    files_in_flight = files_in_flight or decode_workers + 1
+    failures = 0
+    with ProcessPoolExecutor(decode_workers, mp_context=multiprocessing.get_context("spawn")) as decode_pool, \
+            ThreadPoolExecutor(files_in_flight) as file_pool:
+        futures = {
+            file_pool.submit(process_file, client, decode_pool, path, system_prompt, model, api_concurrency): path
+            for path in pending
+        }
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    elapsed = future.result()
+                except Exception as e:
+                    failures += 1
+                    print(f"失敗：{path}：{e}", file=sys.stderr)
+                else:
+                    print(f"完成：{path}（{elapsed:.1f} 秒）", file=sys.stderr)
+        except KeyboardInterrupt:
+            file_pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return failures
+
+def run_live(path: str, api_key: str, system_prompt: str = "", model: str = CHAT_MODEL, replay_speed: Optional[float] = None) -> int:
+    """
+    即時轉錄單一音源，新的字幕片段一完成就輸出到標準輸出
+    replay_speed 有值時以該倍速重播本機檔案（測試用），否則持續讀取錄音中的檔案直到閒置逾時
+    """
+    printed = 0
+
+    def on_update(snapshot: dict):
+        nonlocal printed
+        recent = snapshot["recent"]
+        # recent 只保留最近的片段，以已轉錄片段總數推算尚未輸出的部分
+        new = min(len(recent), snapshot["segments"] - printed)
+        for start, end, text in recent[len(recent) - new:]:
+            print(f"[{format_time(start)}] {text}", flush=True)
+        printed = snapshot["segments"]
+
+    transcriber = LiveTranscriber(
+        init_openai(api_key), system_prompt, model, output_base=output_base(path), on_update=on_update
+    )
+    stop = transcriber.stop_event
+    windows = replay_pcm(path, replay_speed, stop=stop) if replay_speed else follow_pcm(path, stop=stop)
+    try:
+        final = transcriber.run(windows)
+    except KeyboardInterrupt:
+        transcriber.stop()
+        return 130
+    print(
+        f"已轉錄 {final['transcribed_seconds']:.1f} 秒，落後 {final['lag_seconds']:.1f} 秒；"
+        f"產出檔：{', '.join(os.path.basename(output_base(path) + suffix) for suffix in LIVE_ARTIFACTS.values())}",
+        file=sys.stderr
+    )
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批次轉錄、翻譯與摘要音檔，產出檔寫在各音檔旁")
+    parser.add_argument("inputs", nargs="+", help="音檔、目錄或萬用字元（例如 'recordings/**/*.mp3'）")
+    parser.add_argument("-r", "--recursive", action="store_true", help="遞迴搜尋目錄")
+    parser.add_argument("--system-prompt", default="", help="系統角色設定")
+    parser.add_argument("--model", default=CHAT_MODEL, help="摘要與翻譯使用的模型")
+    parser.add_argument("--decode-workers", type=int, default=BATCH_DECODE_WORKERS, help="解碼與編碼的程序數")
+    parser.add_argument("--api-concurrency", type=int, default=BATCH_API_CONCURRENCY, help="所有檔案共用的 API 同時呼叫上限")
+    parser.add_argument("--files-in-flight", type=int, default=None, help="同時處理的檔案數（預設為解碼程序數加一）")
+    parser.add_argument("--force", action="store_true", help="即使已有完整產出也重新處理")
+    parser.add_argument("--live", action="store_true", help="即時轉錄單一錄音中的檔案，邊錄邊輸出")
+    parser.add_argument("--replay", type=float, default=None, metavar="SPEED", help="以指定倍速重播本機檔案來測試即時轉錄")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        parser.error("請設定環境變數 OPENAI_API_KEY")
+    if args.live or args.replay:
+        if len(args.inputs) != 1 or not os.path.isfile(args.inputs[0]):
+            parser.error("即時轉錄需要指定單一音檔")
+        return run_live(args.inputs[0], api_key, args.system_prompt, args.model, args.replay)
+    paths = find_inputs(args.inputs, args.recursive)
+    if not paths:
+        parser.error("找不到符合的音檔")
+
+    failures = run_batch(
+        paths, api_key, args.system_prompt, args.model,
+        decode_workers=args.decode_workers,
+        api_concurrency=args.api_concurrency,
+        files_in_flight=args.files_in_flight,
+        force=args.force
+    )
+    print(f"共 {len(paths)} 個檔案，失敗 {failures} 個", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,102 @@
-MAX_TEXT_LENGTH = 1200
+import os
+
+MAX_TEXT_TOKENS = 4000  # split_text 每段的 token 上限
 CHUNK_SIZE = 100 * 1000  # 100 seconds
 DEFAULT_LANGUAGE = "zh-tw"
+
+# 並行轉錄設定
+TRANSCRIBE_WORKERS = 4  # 同時送出的 Whisper 請求數
+
+# 靜音切點設定
+CHUNK_TOLERANCE = 5 * 1000  # 在目標長度前後 5 秒內尋找最安靜的切點
+ENERGY_FRAME_MS = 20  # 計算能量的音框長度
+QUIET_WINDOW_MS = 300  # 平滑視窗，避免切在單一音框的短暫停頓
+
+# 靜音移除設定：轉錄前移除長靜音，時間戳再換回原始時間軸
+TRIM_SILENCE = os.getenv("WHISPER_TRIM_SILENCE", "1") != "0"
+SILENCE_THRESHOLD_DB = -45  # 音框能量低於此 dBFS 視為非語音
+MIN_SILENCE_MS = 1000  # 連續非語音超過此長度才移除
+SILENCE_PADDING_MS = 250  # 移除的靜音前後各保留的長度
+
+# 上傳前的音頻編碼設定
+AUDIO_CODEC = "flac"  # wav / flac（無損）/ opus / mp3（有損）
+AUDIO_SAMPLE_RATE = 16000  # Whisper 內部使用 16 kHz 單聲道
+AUDIO_BITRATE = "32k"  # 僅用於有損編碼
+
+# 串流解碼設定
+STREAM_WINDOW_MS = 10 * 1000  # 每次從 ffmpeg 讀取的 PCM 長度
+
+# Whisper 設定
+TRANSCRIBE_MODEL = "whisper-1"
+TRANSCRIBE_LANGUAGE = "en"
+
+# 持久化快取設定
+CACHE_DIR = os.getenv("WHISPER_CACHE_DIR", ".cache")
+TRANSCRIPT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 逐字稿快取上限，設為 0 則停用
+COMPLETION_CACHE_TTL = 7 * 24 * 3600  # 聊天完成快取的有效秒數
+COMPLETION_CACHE_MAX_ENTRIES = 512  # 記憶體中保留的項目數
+COMPLETION_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 磁碟快取上限，設為 0 則只用記憶體
+ARTIFACT_CACHE_MAX_BYTES = 128 * 1024 * 1024  # 記憶體中保留的已格式化產出檔大小上限
+
+# 文字處理設定
+CHAT_MODEL = "gpt-4o"
+TEXT_WORKERS = 4  # 同時處理的翻譯片段與管線階段數
+TRANSLATE_CHUNK_TOKENS = 2000  # 每次翻譯的輸入上限，中文輸出約為同等 token 數，需低於模型輸出上限
+
+# 雙語字幕句子對齊設定
+ALIGN_BAND = 100  # 動態規劃只計算偏離對角線此句數以內的格子，時間與記憶體與句數成線性
+
+# 長文摘要（map-reduce）設定
+SUMMARY_DIRECT_TOKENS = 12000  # 超過此長度改用分段摘要再合併
+SUMMARY_SECTION_TOKENS = 6000  # 每個分段的 token 上限
+SUMMARY_FAN_IN = 4  # 每次合併的摘要數
+SUMMARY_MAP_MODEL = "gpt-4o-mini"  # 分段摘要可使用較便宜的模型
+
+# API 背景工作設定
+JOB_WORKERS = 2  # 同時處理的音檔數
+STREAMING_JOB_WORKERS = 4  # 邊上傳邊處理的工作另用的執行緒數；用戶端停頓時不會佔住一般工作的執行緒
+JOB_QUEUE_DEPTH = 8  # 排隊中的工作上限，超過時回應 503
+JOB_RETENTION = 3600  # 完成的工作結果保留秒數
+JOB_MAX_EVENTS = 2000  # 每個工作保留的進度事件數上限，超過時捨棄最舊的事件
+
+# 分段／續傳上傳設定
+UPLOAD_DIR = os.getenv("WHISPER_UPLOAD_DIR", os.path.join(CACHE_DIR, "uploads"))
+UPLOAD_IDLE_TIMEOUT = 300  # 上傳中斷超過此秒數即視為放棄
+
+# OpenAI 連線與速率限制設定（依帳號等級調整）
+OPENAI_MAX_CONNECTIONS = 32  # 每個 API 金鑰共用的 HTTP 連線數
+OPENAI_MAX_RETRIES = 6  # 429 與暫時性錯誤的重試次數
+OPENAI_BACKOFF_BASE = 1.0  # 指數退避的基礎秒數（加上隨機抖動）
+OPENAI_BACKOFF_MAX = 60.0
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 0))  # 同時進行的 API 呼叫上限，0 表示不限制
+WHISPER_RPM = int(os.getenv("WHISPER_RPM", 50))
+CHAT_RPM = int(os.getenv("CHAT_RPM", 500))
+CHAT_TPM = int(os.getenv("CHAT_TPM", 30000))
+CHAT_OUTPUT_TOKENS_ESTIMATE = 1000  # 送出前預扣的輸出 token 數，回應後依實際用量修正
+
+# 檢查點設定
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "runs")
+CHECKPOINT_RETENTION = 7 * 24 * 3600  # 超過此秒數未更新的檢查點會被清除
+
+# Google Drive 匯出設定
+DRIVE_UPLOAD_WORKERS = 4  # 同時上傳的產出檔數
+DRIVE_CHUNK_SIZE = 8 * 1024 * 1024  # 續傳上傳的分塊大小，須為 256 KB 的倍數；較小的檔案以單一請求上傳
+DRIVE_API_ENDPOINT = os.getenv("WHISPER_DRIVE_ENDPOINT")  # 例如 http://127.0.0.1:8766/drive/v3/ 指向本機替身；未設定時使用 Google
+
+# 即時轉錄設定
+LIVE_WINDOW_MS = 1000  # 每次從錄音讀取的 PCM 長度
+LIVE_CHUNK_MS = 5 * 1000  # 滾動轉錄的片段長度，決定逐字稿落後音訊的秒數
+LIVE_CHUNK_TOLERANCE = 1500  # 在目標長度前後此範圍內尋找最安靜的切點
+LIVE_WORKERS = 2  # 同時轉錄的片段數
+LIVE_UPDATE_SECONDS = 30  # 每隔多少秒以新增的逐字稿更新翻譯與重點
+LIVE_IDLE_TIMEOUT = 30  # 錄音檔超過此秒數未增長即視為結束
+LIVE_RECENT_SEGMENTS = 200  # 記憶體中保留的最近字幕片段數，完整內容寫入檔案
+LIVE_RECENT_TRANSLATIONS = 20  # 記憶體中保留的最近翻譯段落數
+LIVE_RECORDINGS_DIR = os.getenv("WHISPER_LIVE_DIR", "recordings")  # 網頁介面只能即時轉錄此目錄中的錄音檔
+LIVE_OUTPUT_DIR = os.getenv("WHISPER_LIVE_OUTPUT_DIR", os.path.join(CACHE_DIR, "live"))  # 網頁介面即時轉錄的輸出目錄
+LIVE_HEARTBEAT_TIMEOUT = 60  # 網頁畫面超過此秒數未更新（例如關閉分頁）即停止即時轉錄
+
+# 批次處理設定
+BATCH_EXTENSIONS = (".mp3", ".wav", ".m4a")
+BATCH_DECODE_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # 解碼與編碼的程序數
+BATCH_API_CONCURRENCY = 8  # 所有檔案共用的 API 呼叫上限
@@ -1,99 +1,265 @@
-import streamlit as st
-from pydub import AudioSegment
-from utils.text_processor import process_text, translate_text, summarize_text
-from utils.openai_client import init_openai, create_transcription
-from tempfile import NamedTemporaryFile
+import os
+import queue
+import threading
 import time
-from utils.subtitle_generator import create_bilingual_srt
+from typing import Optional
+import streamlit as st
+from utils.processing import build_text_pipeline, audio_run_id, make_trimmer
+from utils.checkpoint import RunManifest
+from utils.openai_client import init_openai
+from utils.transcriber import transcribe_chunks
+from utils.audio_stream import stream_audio_chunks
+from config.settings import (
+    TRANSCRIBE_WORKERS, AUDIO_CODEC, LIVE_RECORDINGS_DIR, LIVE_OUTPUT_DIR, LIVE_HEARTBEAT_TIMEOUT
+)
+from utils.artifacts import ArtifactStore
+from utils.segment_store import SegmentStore
+from utils.metrics import timing_snapshot, timing_breakdown
+from utils.live import LiveTranscriber, follow_pcm, replay_pcm
+from utils.subtitle_generator import format_time
+from utils.google_drive_helper import export_to_drive
+
+STAGE_LABELS = {
+    'summary_en': '英文摘要',
+    'translation_zh': '中文逐字稿',
+    'key_points': '重點整理'
+}
+
+TIMING_LABELS = {
+    'decode': '解碼',
+    'chunk_plan': '尋找切割點',
+    'encode': '片段編碼',
+    'whisper': 'Whisper 轉錄',
+    'chat': 'GPT 呼叫',
+    'bilingual_srt': '雙語字幕',
+    'subtitles': '英文字幕'
+}
+
+def run_text_pipeline(client, manifest, inputs: dict) -> dict:
+    """
+    在背景執行緒執行文字管線，主執行緒從佇列取出模型輸出並即時顯示
+    Streamlit 元件只能在主執行緒更新，因此串流回呼只把文字片段放入佇列
+    """
+    updates = queue.Queue()
+    status = st.empty()
+    previews = {name: st.empty() for name in STAGE_LABELS}
+    texts = {name: "" for name in STAGE_LABELS}
+    outcome = {}
 
-def process_audio_with_progress(client, chunks, system_prompt):
-    """處理音頻並顯示進度"""
+    def run():
+        try:
+            outcome['results'] = build_text_pipeline(
+                client, manifest=manifest, on_token=lambda name, token: updates.put((name, token))
+            ).run(
+                inputs,
+                memo=manifest.stage_memo(),
+                on_stage_done=lambda name, cached: updates.put((name, None))
+            )
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            updates.put(None)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    finished = False
+    while not finished:
+        # 一次取出所有已到達的片段再重繪，避免每個 token 都更新畫面
+        items = [updates.get()]
+        while not updates.empty():
+            items.append(updates.get_nowait())
+        changed = set()
+        for item in items:
+            if item is None:
+                finished = True
+                continue
+            name, token = item
+            if token is None:
+                status.text(f'完成：{STAGE_LABELS.get(name, name)}')
+            else:
+                texts[name] += token
+                changed.add(name)
+        for name in changed:
+            previews[name].markdown(f"**{STAGE_LABELS[name]}（生成中）**\n\n{texts[name]}")
+    thread.join()
+
+    status.empty()
+    for preview in previews.values():
+        preview.empty()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['results']
+
+def show_timings(panel, transcribe_rows, text_rows):
+    """在側欄顯示本次處理各階段的耗時分布"""
+    rows = [('轉錄', row) for row in transcribe_rows] + [('摘要與字幕', row) for row in text_rows]
+    if not rows:
+        return
+    with panel.container():
+        st.markdown("### 耗時分析")
+        st.table([
+            {
+                "步驟": step,
+                "階段": TIMING_LABELS.get(stage, stage),
+                "次數": count,
+                "總秒數": round(seconds, 2)
+            }
+            for step, (stage, count, seconds) in rows
+        ])
+        st.caption("階段可能並行執行，總秒數為各次呼叫耗時的加總")
+
+def process_audio_with_progress(client, audio_file, system_prompt, max_workers=TRANSCRIBE_WORKERS, manifest=None):
+    """邊解碼邊並行轉錄音頻，並顯示進度；回傳逐字稿與時間戳片段"""
     progress_bar = st.progress(0)
-    transcript = ""
-    
-    for i, chunk in enumerate(chunks):
-        with st.spinner(f'處理音頻片段 {i+1}/{len(chunks)}...'):
-            with NamedTemporaryFile(suffix=".wav", delete=True) as f:
-                chunk.export(f.name, format="wav")
-                with open(f.name, "rb") as audio_file:
-                    transcript += create_transcription(client, audio_file)
-        progress = (i + 1) / len(chunks)
-        progress_bar.progress(progress)
-    
-    return transcript
-
-def format_transcript(text: str) -> str:
-    """將原始文本分段，使其更易閱讀"""
-    # 按句號分割，但保留句號
-    sentences = [s.strip() + '.' for s in text.split('.') if s.strip()]
-    # 每4句組成一個段落
-    paragraphs = [' '.join(sentences[i:i+4]) for i in range(0, len(sentences), 4)]
-    return '\n\n'.join(paragraphs)
-
-def translate_in_chunks(client, text: str, system_prompt: str, chunk_size: int = 1500) -> str:
-    """分塊翻譯長文本"""
-    # 按句號分割文本
-    sentences = [s.strip() + '.' for s in text.split('.') if s.strip()]
-    chunks = []
-    current_chunk = []
-    current_length = 0
-    
-    for sentence in sentences:
-        if current_length + len(sentence) > chunk_size:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [sentence]
-            current_length = len(sentence)
-        else:
-            current_chunk.append(sentence)
-            current_length += len(sentence)
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    # 翻譯每個塊
-    translated_chunks = []
-    for i, chunk in enumerate(chunks):
-        with st.spinner(f'翻譯進度: {i+1}/{len(chunks)}'):
-            translated = translate_text(client, chunk, system_prompt)
-            translated_chunks.append(translated)
-    
-    return '\n\n'.join(translated_chunks)
-
-def create_download_link(text: str, filename: str) -> str:
-    """創建下載連結"""
-    import base64
-    b64 = base64.b64encode(text.encode('utf-8')).decode()
-    return f'<a href="data:text/plain;base64,{b64}" download="{filename}">下載 {filename}</a>'
-
-def create_bilingual_srt(english_text: str, chinese_text: str) -> str:
-    """創建雙語字幕文件"""
-    # 分割文本為句子
-    english_sentences = [s.strip() for s in english_text.split('.') if s.strip()]
-    chinese_sentences = [s.strip() for s in chinese_text.split('。') if s.strip()]
-    
-    # 確保兩個列表長度相同
-    min_len = min(len(chinese_sentences), len(english_sentences))
-    chinese_sentences = chinese_sentences[:min_len]
-    english_sentences = english_sentences[:min_len]
-    
-    srt_content = []
-    for i, (en, ch) in enumerate(zip(english_sentences, chinese_sentences), 1):
-        # 每個字幕顯示3秒
-        start_time = (i - 1) * 3
-        end_time = start_time + 3
-        
-        # 格式化時間戳
-        start_stamp = f"{int(start_time//3600):02d}:{int((start_time%3600)//60):02d}:{int(start_time%60):02d},000"
-        end_stamp = f"{int(end_time//3600):02d}:{int((end_time%3600)//60):02d}:{int(end_time%60):02d},000"
-        
-        # 添加句號（如果沒有的話）
-        en = en if en.endswith('.') else en + '.'
-        ch = ch if ch.endswith('。') else ch + '。'
-        
-        # 構建字幕塊
-        srt_content.append(f"{i}\n{start_stamp} --> {end_stamp}\n{en}\n{ch}\n\n")
+    status = st.empty()
+    file_size = getattr(audio_file, 'size', 0)
+
+    def on_progress(done, total):
+        # 串流解碼時片段總數未知，以已讀取的上傳位元組估計進度
+        if total:
+            progress_bar.progress(done / total)
+        elif file_size:
+            progress_bar.progress(min(1.0, audio_file.tell() / file_size))
+        status.text(f'已完成音頻片段 {done}')
+
+    stats = []
+    segments = SegmentStore()
+    trimmer = make_trimmer()
+    with st.spinner('串流解碼並並行轉錄音頻片段...'):
+        transcript = transcribe_chunks(
+            client, stream_audio_chunks(audio_file, trimmer=trimmer), max_workers=max_workers,
+            on_progress=on_progress, stats=stats, segments=segments, manifest=manifest
+        )
+    progress_bar.progress(1.0)
+    status.empty()
+    if trimmer is not None:
+        # 時間戳換回原始時間軸，字幕與原始錄音對齊
+        segments.remap(trimmer.offsets)
+        st.caption(
+            f"移除靜音：{trimmer.offsets.removed_seconds:.0f} 秒"
+            f"（佔原始長度 {trimmer.offsets.removed_fraction:.1%}），不上傳也不轉錄"
+        )
+
+    raw_bytes = sum(chunk.raw_bytes for chunk in stats)
+    encoded_bytes = sum(chunk.encoded_bytes for chunk in stats)
+    cached_chunks = sum(chunk.cached for chunk in stats)
+    st.caption(
+        f"上傳大小：{raw_bytes / 1e6:.1f} MB → {encoded_bytes / 1e6:.1f} MB "
+        f"（{AUDIO_CODEC}，平均每片段 {encoded_bytes / max(1, len(stats)) / 1e3:.0f} KB）；"
+        f"快取命中 {cached_chunks}/{len(stats)} 個片段"
+    )
     
-    return ''.join(srt_content)
+    return transcript, segments
+
+def resolve_recording(name: str) -> Optional[str]:
+    """將使用者輸入的檔名解析為錄音目錄中的檔案；目錄以外或不存在時回傳 None"""
+    root = os.path.realpath(LIVE_RECORDINGS_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+def stop_live():
+    """停止目前工作階段的即時轉錄，例如切換到其他處理模式時"""
+    live = st.session_state.pop('live', None)
+    if live is not None:
+        live.stop()
+
+def run_live_mode(client, system_prompt, model):
+    """即時轉錄：持續讀取錄音中的檔案，逐字稿、翻譯與重點隨錄音更新"""
+    name = st.text_input(
+        "錄音檔名稱",
+        help=f"伺服器錄音目錄（{LIVE_RECORDINGS_DIR}）中持續寫入的錄音檔（mp3、wav 等可串流格式）"
+    )
+    replay = st.checkbox("以實際速度重播此檔案（測試用）")
+    live = st.session_state.get('live')
+    running = live is not None and not live.finished
+
+    col1, col2 = st.columns(2)
+    if col1.button("開始即時轉錄", disabled=not name or running):
+        path = resolve_recording(name)
+        if path is None:
+            st.error(f"錄音目錄中找不到檔案：{name}")
+            return
+        # 輸出寫入專用目錄，每次轉錄使用新的檔名，不覆寫既有檔案
+        os.makedirs(LIVE_OUTPUT_DIR, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        output_base = os.path.join(LIVE_OUTPUT_DIR, f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}")
+        live = LiveTranscriber(
+            client, system_prompt, model, output_base=output_base, heartbeat_timeout=LIVE_HEARTBEAT_TIMEOUT
+        )
+        stop = live.stop_event
+        windows = replay_pcm(path, stop=stop) if replay else follow_pcm(path, stop=stop)
+
+        def run():
+            try:
+                live.run(windows)
+            except Exception:
+                pass  # 錯誤保留在 live.error，由下方顯示
+
+        st.session_state.live = live
+        threading.Thread(target=run, daemon=True).start()
+    if col2.button("停止", disabled=not running) and live is not None:
+        live.stop()
+    if live is None:
+        return
+
+    status = st.empty()
+    transcript_box = st.empty()
+    col_zh, col_points = st.columns(2)
+    with col_zh:
+        st.markdown("### 中文翻譯（最近）")
+        translation_box = st.empty()
+    with col_points:
+        st.markdown("### 重點整理")
+        points_box = st.empty()
+    # 背景執行緒負責轉錄；此處定期讀取狀態重繪，直到錄音結束或按下停止
+    while True:
+        live.touch()
+        snapshot = live.snapshot()
+        status.caption(
+            f"已接收 {snapshot['received_seconds']:.0f} 秒音訊，逐字稿落後 {snapshot['lag_seconds']:.1f} 秒；"
+            f"已轉錄 {snapshot['chunks']} 個片段"
+        )
+        lines = [f"`{format_time(start)[:8]}` {text}" for start, end, text in snapshot['recent'][-30:]]
+        transcript_box.markdown("\n\n".join(lines) or "等待音訊...")
+        translation_box.markdown(snapshot['translation_zh'][-3000:] or "尚未更新")
+        points_box.markdown(snapshot['key_points'] or "尚未更新")
+        if snapshot['finished']:
+            break
+        time.sleep(1)
+    if snapshot['error']:
+        st.error(f"即時轉錄中斷：{snapshot['error']}")
+    else:
+        st.success(f"即時轉錄結束，完整內容已寫入 {live.output_base}.live.* 檔案")
+
+def download_button(artifacts: ArtifactStore, name: str):
+    """
+    以 Streamlit 下載按鈕提供產出檔，內容由伺服器端點傳送，不內嵌在頁面中
+    內容在按下按鈕時才產生，按下後也不重新執行頁面
+    """
+    spec = artifacts.spec(name)
+    st.download_button(
+        f"下載 {spec.filename}",
+        data=lambda: artifacts.data(name),
+        file_name=spec.filename,
+        mime=spec.mime_type,
+        on_click="ignore",
+        key=f"download_{name}"
+    )
+
+def export_button(artifacts: ArtifactStore, folder_name: str):
+    """將所有產出檔並行上傳到 Google Drive 的同一個資料夾，並列出連結"""
+    if st.button("匯出到 Google Drive", key="export_drive"):
+        files = {}
+        for name in artifacts.names():
+            spec = artifacts.spec(name)
+            files[spec.filename] = (artifacts.data(name), spec.mime_type)
+        with st.spinner('上傳到 Google Drive 中...'):
+            links = export_to_drive(files, folder_name)
+        for filename, link in links.items():
+            if link:
+                st.markdown(f"- [{filename}]({link})")
 
 def show_instructions():
     st.markdown("""
@@ -104,7 +270,7 @@ def show_instructions():
     
     2. **上傳音檔**
         - 支援的格式：MP3, WAV, M4A
-        - 檔案大小限制：25MB
+        - 長音檔會以串流方式解碼，不需事先分割
     
     3. **處理過程**
         - 系統會自動將音檔轉換為文字
@@ -145,6 +311,24 @@ def main():
             help="gpt-4o: 穩定但較慢，token 耗用較多\ngpt-4o-mini: 便宜但速度較快"
         )
         
+        max_workers = st.slider(
+            "並行轉錄數",
+            min_value=1,
+            max_value=16,
+            value=TRANSCRIBE_WORKERS,
+            help="同時送出的 Whisper 請求數，數值越大長音檔越快，但較容易觸發速率限制"
+        )
+        
+        mode = st.radio(
+            "處理模式",
+            ["上傳音檔", "即時轉錄"],
+            help="即時轉錄會持續讀取錄音中的檔案，逐字稿落後錄音數秒"
+        )
+        if mode != "即時轉錄":
+            stop_live()
+
+        timing_panel = st.empty()
+
         st.markdown("---")
         if st.button("顯示使用說明"):
             show_instructions()
@@ -176,137 +360,116 @@ def main():
             help="例如：You specialize in endocrinology and diabetes..."
         )
         
+        if mode == "即時轉錄":
+            run_live_mode(client, system_prompt, model)
+            return
+
         # 檔案上傳
         audio_file = st.file_uploader("上傳音檔", type=["mp3", "wav", "m4a"])
         
         if audio_file is not None:
-            if 'processed_results' not in st.session_state:
+            # 以檔案內容與設定產生執行編號；重跑或中斷後從檢查點繼續，已完成的片段與階段不再重做
+            # 計算需要讀過整個檔案，每個上傳的檔案只算一次，網頁重新執行時沿用
+            if st.session_state.get('audio_file_id') != audio_file.file_id:
+                st.session_state.audio_run_id = audio_run_id(audio_file)
+                st.session_state.audio_file_id = audio_file.file_id
+            run_id = st.session_state.audio_run_id
+            # 指標為整個程序共用；多人同時使用時，耗時分析可能包含其他工作階段的呼叫
+            timings = timing_snapshot()
+            if st.session_state.get('run_id') != run_id:
+                manifest = RunManifest(run_id)
+                if manifest.chunks:
+                    st.info(f"從檢查點繼續：已完成 {len(manifest.chunks)} 個音頻片段")
                 with st.spinner('處理音檔中...'):
-                    # 讀取音頻
-                    audio_data = AudioSegment.from_file(audio_file)
-                    
-                    # 分割音頻
-                    chunk_length = 100 * 1000  # 100 seconds
-                    chunks = [
-                        audio_data[i:i + chunk_length]
-                        for i in range(0, len(audio_data), chunk_length)
-                    ]
-                    
-                    # 處理音頻並顯示進度
-                    transcript = process_audio_with_progress(client, chunks, system_prompt)
-                    
-                    # 更新模型選擇
-                    messages = [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": transcript}
-                    ]
-                    
-                    # 使用選擇的模型
-                    response = client.chat.completions.create(
-                        model=model,
-                        messages=messages
+                    # 串流解碼、在靜音處分割並轉錄音頻，不將整個檔案解碼到記憶體
+                    transcript, segments = process_audio_with_progress(
+                        client, audio_file, system_prompt, max_workers, manifest
                     )
-                    
-                    # 處理文本
-                    with st.spinner('生成摘要中...'):
-                        processed_transcript = process_text(client, transcript, system_prompt)
-                        processed_transcript_ch = translate_text(client, transcript, system_prompt)
-                        processed_summary = summarize_text(client, processed_transcript, system_prompt)
-                        processed_summary_str = "\n".join(processed_summary)
-                        
-                        # 保存結果
-                        st.session_state.processed_results = {
-                            'transcript': transcript,
-                            'processed_transcript_ch': processed_transcript_ch,
-                            'processed_transcript': processed_transcript,
-                            'processed_summary_str': processed_summary_str
-                        }
-                
-            # 顯示結果
-            if st.session_state.processed_results:
-                results = st.session_state.processed_results
+                    st.session_state.transcript = transcript
+                    st.session_state.segments = segments
+                    st.session_state.manifest = manifest
+                    st.session_state.run_id = run_id
+                    st.session_state.transcribe_timings = timing_breakdown(timings)
+                timings = timing_snapshot()
+            manifest = st.session_state.manifest
+
+            # 翻譯、摘要與重點整理依相依關係並行執行；每次重跑只重新計算輸入有變的階段
+            # 模型輸出邊生成邊顯示，完成後換成下方的完整結果
+            with st.spinner('生成摘要與翻譯中...'):
+                results = run_text_pipeline(client, manifest, {
+                    'transcript': st.session_state.transcript,
+                    'system_prompt': system_prompt,
+                    'model': model
+                })
+
+            # 顯示結果；產出檔依內容雜湊記住，重新執行時不會重新格式化
+            # 同一次執行與設定沿用工作階段中的 ArtifactStore，網頁重新執行時不重新計算內容雜湊
+            artifacts_key = (run_id, system_prompt, model)
+            if st.session_state.get('artifacts_key') != artifacts_key:
+                st.session_state.artifacts = ArtifactStore.from_results(
+                    {**results, 'segments': st.session_state.segments}
+                )
+                st.session_state.artifacts_key = artifacts_key
+            artifacts = st.session_state.artifacts
+
+            # 原始長文（分段）
+            with st.expander("原始長文", expanded=False):
+                st.markdown(f"<div style='font-size: 14px;'>{artifacts.text('transcript')}</div>", 
+                          unsafe_allow_html=True)
+                download_button(artifacts, 'transcript')
+
+            # 中文逐字稿（分塊翻譯）
+            with st.expander("中文逐字稿", expanded=True):
+                st.markdown(f"<div style='font-size: 14px;'>{results['translation_zh']}</div>", 
+                          unsafe_allow_html=True)
+                download_button(artifacts, 'translation_zh')
+
+            # 英文摘要
+            with st.expander("英文摘要", expanded=False):
+                st.markdown(f"<div style='font-size: 14px;'>{results['summary_en']}</div>", 
+                          unsafe_allow_html=True)
+                download_button(artifacts, 'summary_en')
+
+            # 重點整理
+            with st.expander("重點整理", expanded=True):
+                st.markdown(f"<div style='font-size: 14px;'>{results['key_points']}</div>", 
+                          unsafe_allow_html=True)
+                download_button(artifacts, 'key_points')
+            
+            st.markdown("---")
+            st.markdown("### 下載選項")
+            col1, col2, col3 = st.columns(3)
+            
+            # 下載所有內容與字幕
+            try:
+                with col1:
+                    download_button(artifacts, 'complete')
+                with col2:
+                    download_button(artifacts, 'bilingual_srt')
+                    st.caption("雙語字幕檔 (SRT格式)")
+                with col3:
+                    if 'srt' in artifacts.names():
+                        download_button(artifacts, 'srt')
+                        download_button(artifacts, 'vtt')
+                        st.caption("英文字幕檔（依 Whisper 時間戳）")
                 
-                # 原始長文（分段）
-                with st.expander("原始長文", expanded=False):
-                    formatted_transcript = format_transcript(results['transcript'])
-                    st.markdown(f"<div style='font-size: 14px;'>{formatted_transcript}</div>", 
-                              unsafe_allow_html=True)
-                    st.markdown(create_download_link(formatted_transcript, "original_transcript.txt"), 
-                              unsafe_allow_html=True)
-
-                # 中文逐字稿（分塊翻譯）
-                with st.expander("中文逐字稿", expanded=True):
-                    if '分塊翻譯' not in st.session_state:
-                        with st.spinner('正在翻譯長文本...'):
-                            translated_text = translate_in_chunks(client, results['transcript'], system_prompt)
-                            st.session_state.分塊翻譯 = translated_text
+                export_button(artifacts, os.path.splitext(audio_file.name)[0])
+
+                # 可選：顯示字幕預覽
+                if st.checkbox("預覽字幕"):
+                    st.text_area("字幕預覽", artifacts.text('bilingual_srt'), height=200)
                     
-                    st.markdown(f"<div style='font-size: 14px;'>{st.session_state.分塊翻譯}</div>", 
-                              unsafe_allow_html=True)
-                    st.markdown(create_download_link(st.session_state.分塊翻譯, "chinese_translation.txt"), 
-                              unsafe_allow_html=True)
-
-                # 英文摘要
-                with st.expander("英文摘要", expanded=False):
-                    st.markdown(f"<div style='font-size: 14px;'>{results['processed_transcript']}</div>", 
-                              unsafe_allow_html=True)
-                    st.markdown(create_download_link(results['processed_transcript'], "english_summary.txt"), 
-                              unsafe_allow_html=True)
-
-                # 重點整理
-                with st.expander("重點整理", expanded=True):
-                    st.markdown(f"<div style='font-size: 14px;'>{results['processed_summary_str']}</div>", 
-                              unsafe_allow_html=True)
-                    st.markdown(create_download_link(results['processed_summary_str'], "key_points.txt"), 
-                              unsafe_allow_html=True)
-                
-                # 下載所有內容
-                all_content = f"""原始長文：
-{formatted_transcript}
-
-中文逐字稿：
-{st.session_state.get('分塊翻譯', '翻譯處理中...')}
-
-英文摘要：
-{results['processed_transcript']}
-
-重點整理：
-{results['processed_summary_str']}
-"""
-                st.markdown("---")
-                st.markdown("### 下載選項")
-                col1, col2, col3 = st.columns(3)
-                
-                # 生成雙語字幕
-                if '分塊翻譯' in st.session_state:
-                    try:
-                        srt_content = create_bilingual_srt(
-                            results['transcript'],
-                            st.session_state.分塊翻譯
-                        )
-                        
-                        with col1:
-                            st.markdown(create_download_link(all_content, "complete_summary.txt"), 
-                                      unsafe_allow_html=True)
-                        with col2:
-                            st.markdown(create_download_link(srt_content, "bilingual_subtitles.srt"), 
-                                      unsafe_allow_html=True)
-                            st.caption("雙語字幕檔 (SRT格式)")
-                        
-                        # 可選：顯示字幕預覽
-                        if st.checkbox("預覽字幕"):
-                            st.text_area("字幕預覽", srt_content, height=200)
-                            
-                    except Exception as e:
-                        st.error(f"生成字幕時發生錯誤：{str(e)}")
+            except Exception as e:
+                st.error(f"生成字幕時發生錯誤：{str(e)}")
+
+            show_timings(timing_panel, st.session_state.get('transcribe_timings', []), timing_breakdown(timings))
+            
+            # 添加重置按鈕
+            if st.button('處理新的音頻'):
+                for key in ('transcript', 'segments', 'manifest', 'run_id', 'transcribe_timings', 'artifacts', 'artifacts_key'):
+                    st.session_state.pop(key, None)
+                st.rerun()
                 
-                # 添加重置按鈕
-                if st.button('處理新的音頻'):
-                    st.session_state.processed_results = None
-                    if '分塊翻譯' in st.session_state:
-                        del st.session_state.分塊翻譯
-                    st.experimental_rerun()
-                    
     except Exception as e:
         st.error(f"發生錯誤：{str(e)}")
 
@@ -0,0 +1,73 @@
+import math
+import random
+import pytest
+from utils.alignment import MOVES, PRIORS, align_sentences, length_cost
+from utils.subtitle_generator import create_bilingual_srt
+
+def bead_cost(source, target, bead, ratio):
+    (i0, i1), (j0, j1) = bead
+    k = MOVES.index((i1 - i0, j1 - j0))
+    source_len = sum(len(s) for s in source[i0:i1])
+    target_len = sum(len(s) for s in target[j0:j1])
+    return float(length_cost(source_len, target_len, ratio, PRIORS[k]))
+
+def path_cost(source, target, beads):
+    ratio = sum(map(len, target)) / sum(map(len, source))
+    return sum(bead_cost(source, target, bead, ratio) for bead in beads)
+
+def full_dp_cost(source, target):
+    """不限制帶寬、逐格計算的 Gale–Church 動態規劃，作為最佳解的參考"""
+    n, m = len(source), len(target)
+    ratio = sum(map(len, target)) / sum(map(len, source))
+    cost = [[math.inf] * (m + 1) for _ in range(n + 1)]
+    cost[0][0] = 0.0
+    for i in range(n + 1):
+        for j in range(m + 1):
+            for di, dj in MOVES:
+                if (di or dj) and i >= di and j >= dj and cost[i - di][j - dj] < math.inf:
+                    bead = ((i - di, i), (j - dj, j))
+                    cost[i][j] = min(cost[i][j], cost[i - di][j - dj] + bead_cost(source, target, bead, ratio))
+    return cost[n][m]
+
+def random_corpus(seed: int, n: int):
+    """隨機長度的英文句子與對應的中文句子，夾雜合併、拆分與缺漏"""
+    rng = random.Random(seed)
+    source, target = [], []
+    for _ in range(n):
+        length = rng.randint(10, 160)
+        source.append("x" * length)
+        translated = max(1, int(length * 0.4 * rng.uniform(0.7, 1.3)))
+        roll = rng.random()
+        if roll < 0.08 and target:
+            target[-1] += "字" * translated
+        elif roll < 0.16:
+            half = max(1, translated // 2)
+            target.extend(["字" * half, "字" * max(1, translated - half)])
+        elif roll < 0.2:
+            continue
+        else:
+            target.append("字" * translated)
+    return source, target
+
+def assert_covers(beads, n, m):
+    assert beads[0][0][0] == 0 and beads[0][1][0] == 0
+    assert beads[-1][0][1] == n and beads[-1][1][1] == m
+    for (a, b) in zip(beads, beads[1:]):
+        assert a[0][1] == b[0][0] and a[1][1] == b[1][0]
+
+@pytest.mark.parametrize("seed", range(8))
+def test_matches_full_dp(seed):
+    source, target = random_corpus(seed, 60)
+    expected = full_dp_cost(source, target)
+    for band in (len(source) + len(target), 8):
+        beads = align_sentences(source, target, band=band)
+        assert_covers(beads, len(source), len(target))
+        assert path_cost(source, target, beads) == pytest.approx(expected, rel=1e-9, abs=1e-6)
+
+def test_one_side_empty():
+    assert align_sentences(["a", "b"], []) == [((0, 1), (0, 0)), ((1, 2), (0, 0))]
+    assert align_sentences([], ["a"]) == [((0, 0), (0, 1))]
+
+def test_chinese_without_english_is_kept():
+    srt = create_bilingual_srt("", "只有中文。沒有英文。")
+    assert srt == "1\n00:00:00,000 --> 00:00:03,000\n只有中文。沒有英文。\n\n"
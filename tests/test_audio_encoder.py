@@ -0,0 +1,11 @@
+import shutil
+import pytest
+from pydub.generators import Sine
+from utils.audio_encoder import CODECS, encode_chunk
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="需要 ffmpeg")
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_encoding_is_deterministic(codec):
+    # 轉錄快取以編碼後的位元組為鍵，同一片段每次編碼必須完全相同
+    chunk = Sine(440).to_audio_segment(duration=2000).set_frame_rate(16000).set_channels(1)
+    assert encode_chunk(chunk, codec=codec).data == encode_chunk(chunk, codec=codec).data
@@ -0,0 +1,35 @@
+import io
+import shutil
+import pytest
+from pydub.generators import Sine
+from utils.audio_stream import iter_pcm_windows
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="需要 ffmpeg")
+
+class ClosedMidway:
+    """讀到一半時來源被關閉，模擬上傳在處理途中被刪除"""
+
+    def __init__(self, data: bytes, limit: int):
+        self._file = io.BytesIO(data)
+        self.limit = limit
+
+    def read(self, size: int = -1) -> bytes:
+        if self._file.tell() >= self.limit:
+            self._file.close()
+        return self._file.read(min(size, self.limit - self._file.tell()) if size > 0 else size)
+
+def mp3_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Sine(440).to_audio_segment(duration=10000).export(buffer, format="mp3")
+    return buffer.getvalue()
+
+def test_complete_source_decodes():
+    data = mp3_bytes()
+    pcm = b"".join(iter_pcm_windows(io.BytesIO(data)))
+    assert len(pcm) > 16000 * 2 * 9
+
+def test_source_closed_midway_fails_instead_of_truncating():
+    data = mp3_bytes()
+    with pytest.raises(ValueError):
+        for _ in iter_pcm_windows(ClosedMidway(data, len(data) // 3)):
+            pass
@@ -0,0 +1,48 @@
+import time
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from bench.fake_drive import FakeDriveServer
+from utils.google_drive_helper import DriveExporter, build_drive_service
+
+LATENCY = 0.2
+CHUNK_SIZE = 256 * 1024
+
+@pytest.fixture
+def server():
+    server = FakeDriveServer(latency=LATENCY).start()
+    yield server
+    server.stop()
+
+def test_export_against_local_stub(server):
+    exporter = DriveExporter(
+        service=build_drive_service(None, server.endpoint), endpoint=server.endpoint, chunk_size=CHUNK_SIZE
+    )
+    large = b"\x01" * (CHUNK_SIZE * 3 + 1000)
+    artifacts = {"large.srt": (large, "application/x-subrip"), "small.txt": ("逐字稿", "text/plain")}
+    artifacts.update({f"extra{i}.txt": (f"內容 {i}", "text/plain") for i in range(4)})
+
+    start = time.perf_counter()
+    links = exporter.export(artifacts, "lecture")
+    elapsed = time.perf_counter() - start
+
+    assert set(links) == set(artifacts) and all(links.values())
+    files = {entry["name"]: entry for entry in server.files.values()}
+    folder_id = files["lecture"]["id"]
+    assert files["large.srt"]["size"] == len(large)
+    assert files["small.txt"]["size"] == len("逐字稿".encode("utf-8"))
+    assert all(files[name]["parents"] == [folder_id] for name in artifacts)
+
+    # 小檔以單一請求上傳，大檔以續傳分塊上傳（中間的分塊回應 308）
+    assert server.calls["create"] == 1
+    assert server.calls["multipart"] == 5
+    assert server.calls["resumable_start"] == 1
+    assert server.calls["resumable_chunk"] == 4
+    # 依序上傳需要每個請求各等一次延遲；並行時只剩資料夾與最長的續傳上傳
+    assert elapsed < 0.75 * sum(server.calls.values()) * LATENCY
+
+    # 同一資料夾只查詢與建立一次
+    exporter.export({"again.txt": ("再次匯出", "text/plain")}, "lecture")
+    assert server.calls["create"] == 1
+    assert server.calls["list"] == 1
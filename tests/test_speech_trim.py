@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from utils.segment_store import SegmentStore
+from utils.speech_trim import OffsetMap, SilenceTrimmer
+
+SAMPLE_RATE = 16000
+
+def synthetic_pcm(seed: int = 0) -> np.ndarray:
+    """交錯的語音（大聲的雜訊）與長短不一的靜音（低於門檻的微弱雜訊），長度刻意不對齊音框"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for _ in range(12):
+        speech = int(rng.integers(SAMPLE_RATE // 4, 2 * SAMPLE_RATE)) + int(rng.integers(0, 320))
+        silence = int(rng.choice([SAMPLE_RATE // 5, SAMPLE_RATE // 2, 2 * SAMPLE_RATE, 5 * SAMPLE_RATE]))
+        parts.append(rng.integers(-12000, 12000, speech))
+        parts.append(rng.integers(-3, 4, silence + int(rng.integers(0, 320))))
+    return np.concatenate(parts).astype(np.int16)
+
+def trim(pcm: bytes, window: int):
+    trimmer = SilenceTrimmer(sample_rate=SAMPLE_RATE)
+    out = bytearray()
+    for start in range(0, len(pcm), window):
+        out.extend(trimmer.feed(pcm[start:start + window]))
+    out.extend(trimmer.flush())
+    return bytes(out), trimmer.offsets
+
+def test_output_is_identical_across_window_sizes():
+    pcm = synthetic_pcm().tobytes()
+    expected, offsets = trim(pcm, len(pcm))
+    assert offsets.removed_fraction > 0.2
+    for window in (2, 638, 640, 4097 * 2, 65536):
+        trimmed, other = trim(pcm, window)
+        assert trimmed == expected
+        assert list(other.trimmed) == list(offsets.trimmed)
+        assert list(other.original) == list(offsets.original)
+
+def test_trimmed_samples_map_back_exactly():
+    original = synthetic_pcm(seed=1)
+    data, offsets = trim(original.tobytes(), 3000)
+    trimmed = np.frombuffer(data, dtype=np.int16)
+    times = np.arange(len(trimmed)) / SAMPLE_RATE
+    positions = np.rint(offsets.to_original(times) * SAMPLE_RATE).astype(np.int64)
+    assert np.all(np.diff(positions) >= 1)
+    assert np.array_equal(original[positions], trimmed)
+    assert offsets.original_duration == pytest.approx(len(original) / SAMPLE_RATE)
+    assert offsets.trimmed_duration == pytest.approx(len(trimmed) / SAMPLE_RATE)
+
+def test_segment_store_remap():
+    offsets = OffsetMap()
+    offsets.add(2.0, 5.0)
+    offsets.add(4.0, 10.0)
+    store = SegmentStore.from_list([(0.5, 2.0, "first"), (2.0, 3.5, "second"), (3.5, 4.0, "third"), (4.0, 4.5, "fourth")])
+    store.remap(offsets)
+    # 結束時間落在斷點上時屬於前一段，開始時間屬於下一段
+    assert store.to_list() == [
+        [0.5, 2.0, "first"], [5.0, 6.5, "second"], [6.5, 7.0, "third"], [10.0, 10.5, "fourth"]
+    ]
+    assert store.text == "first second third fourth"
+    assert offsets.to_original(3.0) == offsets.to_original(np.array([3.0]))[0] == 6.0
+
+def test_segment_store_remap_empty():
+    store = SegmentStore()
+    store.remap(OffsetMap())
+    assert len(store) == 0
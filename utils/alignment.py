@@ -0,0 +1,109 @@
+from collections import deque
+from typing import List, Sequence, Tuple
+import math
+import numpy as np
+from config.settings import ALIGN_BAND
+
+# 對齊方式 (來源句數, 目標句數) 與 Gale–Church 的先驗機率
+MOVES = ((1, 1), (1, 0), (0, 1), (2, 1), (1, 2))
+PRIORS = (0.89, 0.0099, 0.0099, 0.089, 0.089)
+SKIP_TARGET = MOVES.index((0, 1))
+VARIANCE = 6.8  # 長度差異的變異數（每個來源字元）
+ROW_BLOCK = 512  # 每次向量化計算長度成本的列數
+
+Bead = Tuple[Tuple[int, int], Tuple[int, int]]  # ((來源起, 來源迄), (目標起, 目標迄))，左閉右開
+
+def _log_erfc(x: np.ndarray) -> np.ndarray:
+    """log(erfc(x))，x >= 0；以 Chebyshev 近似在對數空間計算，x 很大時也不會下溢"""
+    t = 1.0 / (1.0 + 0.5 * x)
+    poly = -1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    return np.log(t) - x * x + poly
+
+def length_cost(source_len, target_len, ratio: float, prior: float) -> np.ndarray:
+    """
+    Gale–Church 的長度成本：-log P(長度差異 | 對齊) - log P(對齊方式)
+    ratio 為目標語言每個來源字元對應的平均字元數
+    """
+    source_len = np.asarray(source_len, dtype=np.float64)
+    target_len = np.asarray(target_len, dtype=np.float64) / ratio
+    mean = (source_len + target_len) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.where(mean > 0, np.abs(source_len - target_len) / np.sqrt(VARIANCE * mean), 0.0)
+    # P(|δ| 以上) = erfc(|δ| / √2)
+    return -_log_erfc(delta / math.sqrt(2)) - math.log(prior)
+
+def align_sentences(source: Sequence[str], target: Sequence[str], band: int = ALIGN_BAND) -> List[Bead]:
+    """
+    以句子長度的動態規劃對齊兩種語言的句子（Gale–Church），支援 1-1、2-1、1-2 與單邊略過
+    只計算對角線附近 band 句以內的格子，每一列以 NumPy 向量化計算，
+    時間與記憶體與句數成線性；回傳依序涵蓋所有句子的對齊區塊
+    """
+    n, m = len(source), len(target)
+    if n == 0 or m == 0:
+        return [((i, i + 1), (0, 0)) for i in range(n)] + [((n, n), (j, j + 1)) for j in range(m)]
+
+    source_len = np.fromiter((len(s) for s in source), dtype=np.float64, count=n)
+    target_len = np.fromiter((len(s) for s in target), dtype=np.float64, count=m)
+    source_cum = np.concatenate(([0.0], np.cumsum(source_len)))
+    target_cum = np.concatenate(([0.0], np.cumsum(target_len)))
+    ratio = target_cum[-1] / source_cum[-1]
+    skip_target = np.concatenate(([0.0], length_cost(0.0, target_len, ratio, PRIORS[SKIP_TARGET])))
+
+    # 每列計算以對角線為中心、固定寬度的一段欄位；寬度至少要容納相鄰兩列之間對角線的位移
+    width = min(2 * (band + math.ceil(m / n)) + 5, m + 1)
+    centers = np.arange(n + 1) * m // n
+    lows = np.clip(centers - width // 2, 0, m + 1 - width)
+    offsets = np.arange(width)
+
+    rows = deque(maxlen=2)  # 只保留前兩列的成本
+    backpointers = np.zeros((n + 1, width), dtype=np.int8)
+    for block_start in range(0, n + 1, ROW_BLOCK):
+        # 長度成本與動態規劃無關，整批列一次向量化算好，逐列遞推時只剩平移與取最小值
+        block = np.arange(block_start, min(block_start + ROW_BLOCK, n + 1))
+        cols = lows[block, None] + offsets
+        costs = {}
+        for k, (di, dj) in enumerate(MOVES):
+            if di == 0:
+                continue
+            source_span = (source_cum[block] - source_cum[np.maximum(block - di, 0)])[:, None]
+            target_span = target_cum[cols] - target_cum[np.maximum(cols - dj, 0)]
+            costs[k] = length_cost(source_span, target_span, ratio, PRIORS[k])
+        steps = skip_target[cols]
+        steps[:, 0] = 0.0
+        prefixes = np.cumsum(steps, axis=1)
+
+        for r, i in enumerate(block):
+            # 各對齊方式的候選成本排成一個矩陣，一次取最小值；1-0 與 1-1 等只差在平移量
+            candidates = np.full((len(MOVES), width), np.inf)
+            if i == 0:
+                candidates[0, 0] = 0.0
+            for k, cost in costs.items():
+                di, dj = MOVES[k]
+                if di > len(rows):
+                    continue
+                # 前一列的欄位 j - dj 在該列範圍內的位置 = t + shift
+                shift = int(lows[i] - lows[i - di]) - dj
+                lo, hi = max(0, -shift), min(width, width - shift)
+                if lo < hi:
+                    np.add(rows[-di][lo + shift:hi + shift], cost[r, lo:hi], out=candidates[k, lo:hi])
+            moves = backpointers[i]
+            moves[:] = candidates.argmin(axis=0)
+            best = candidates[moves, offsets]
+            # 同一列內的略過目標句會串接，以前綴和與累積最小值一次算完
+            prefix = prefixes[r]
+            chained = prefix + np.minimum.accumulate(best - prefix)
+            skipped = chained < best - 1e-9
+            best[skipped] = chained[skipped]
+            moves[skipped] = SKIP_TARGET
+            rows.append(best)
+
+    beads = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        di, dj = MOVES[backpointers[i, j - lows[i]]]
+        beads.append(((i - di, i), (j - dj, j)))
+        i, j = i - di, j - dj
+    beads.reverse()
+    return beads
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import threading
+from .metrics import record_cache
+from .segment_store import SegmentStore
+from .subtitle_generator import create_bilingual_srt, iter_srt, iter_vtt
+from config.settings import ARTIFACT_CACHE_MAX_BYTES
+
+class ArtifactSpec(NamedTuple):
+    filename: str
+    mime_type: str
+    label: str
+    inputs: Tuple[str, ...]  # 決定內容的欄位，用來計算記憶的雜湊
+    needs_segments: bool = False
+
+ARTIFACTS: Dict[str, ArtifactSpec] = {
+    'transcript': ArtifactSpec('original_transcript.txt', 'text/plain', '原始長文', ('transcript',)),
+    'translation_zh': ArtifactSpec('chinese_translation.txt', 'text/plain', '中文逐字稿', ('translation_zh',)),
+    'summary_en': ArtifactSpec('english_summary.txt', 'text/plain', '英文摘要', ('summary_en',)),
+    'key_points': ArtifactSpec('key_points.txt', 'text/plain', '重點整理', ('key_points',)),
+    'complete': ArtifactSpec(
+        'complete_summary.txt', 'text/plain', '完整內容',
+        ('transcript', 'translation_zh', 'summary_en', 'key_points')
+    ),
+    'bilingual_srt': ArtifactSpec(
+        'bilingual_subtitles.srt', 'application/x-subrip', '雙語字幕', ('transcript', 'translation_zh', 'segments')
+    ),
+    'srt': ArtifactSpec('subtitles.srt', 'application/x-subrip', '英文字幕（SRT）', ('segments',), True),
+    'vtt': ArtifactSpec('subtitles.vtt', 'text/vtt', '英文字幕（WebVTT）', ('segments',), True),
+}
+
+def format_transcript(text: str) -> str:
+    """將原始文本分段，使其更易閱讀"""
+    # 按句號分割，但保留句號
+    sentences = [s.strip() + '.' for s in text.split('.') if s.strip()]
+    # 每4句組成一個段落
+    paragraphs = [' '.join(sentences[i:i+4]) for i in range(0, len(sentences), 4)]
+    return '\n\n'.join(paragraphs)
+
+class _ArtifactCache:
+    """依內容雜湊保存已格式化的產出檔，超過大小上限時淘汰最久未使用的項目"""
+
+    def __init__(self, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+_cache = _ArtifactCache()
+
+class ArtifactStore:
+    """
+    一次執行的所有產出檔：每個產出在第一次被下載時才格式化
+    結果依輸入內容的雜湊記住，網頁重新執行或重新建立 ArtifactStore 時不會重做
+    """
+
+    def __init__(
+        self,
+        transcript: str,
+        translation_zh: str,
+        summary_en: str,
+        key_points: str,
+        segments: Optional[SegmentStore] = None
+    ):
+        self._fields = {
+            'transcript': transcript,
+            'translation_zh': translation_zh,
+            'summary_en': summary_en,
+            'key_points': key_points,
+            'segments': segments,
+        }
+        self._digests: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_results(cls, results: dict) -> "ArtifactStore":
+        """由 process_audio_source 或文字管線的結果建立"""
+        return cls(
+            results['transcript'],
+            results['translation_zh'],
+            results['summary_en'],
+            results['key_points'],
+            results.get('segments')
+        )
+
+    def names(self) -> List[str]:
+        """目前可提供的產出；沒有時間戳時不提供依時間戳產生的字幕"""
+        has_segments = self._fields['segments'] is not None and len(self._fields['segments'])
+        return [name for name, spec in ARTIFACTS.items() if has_segments or not spec.needs_segments]
+
+    def spec(self, name: str) -> ArtifactSpec:
+        if name not in self.names():
+            raise KeyError(name)
+        return ARTIFACTS[name]
+
+    def _digest(self, field: str) -> str:
+        with self._lock:
+            digest = self._digests.get(field)
+            if digest is None:
+                value = self._fields[field]
+                if value is None:
+                    digest = ""
+                elif isinstance(value, SegmentStore):
+                    digest = value.digest()
+                else:
+                    digest = hashlib.sha256(value.encode('utf-8')).hexdigest()
+                self._digests[field] = digest
+            return digest
+
+    def key(self, name: str) -> str:
+        """產出內容的雜湊，可作為 HTTP ETag"""
+        parts = [name] + [self._digest(field) for field in self.spec(name).inputs]
+        return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+
+    def _build(self, name: str) -> str:
+        fields = self._fields
+        if name == 'transcript':
+            return format_transcript(fields['transcript'])
+        if name == 'complete':
+            return f"""原始長文：
+{self.text('transcript')}
+
+中文逐字稿：
+{fields['translation_zh']}
+
+英文摘要：
+{fields['summary_en']}
+
+重點整理：
+{fields['key_points']}
+"""
+        if name == 'bilingual_srt':
+            return create_bilingual_srt(fields['transcript'], fields['translation_zh'], segments=fields['segments'])
+        if name == 'srt':
+            return ''.join(iter_srt(fields['segments']))
+        if name == 'vtt':
+            return ''.join(iter_vtt(fields['segments']))
+        return fields[name]
+
+    def data(self, name: str) -> bytes:
+        """取得產出檔內容（UTF-8）；同樣的輸入只格式化一次"""
+        key = self.key(name)
+        data = _cache.get(key)
+        record_cache("artifact", hit=data is not None)
+        if data is None:
+            data = self._build(name).encode('utf-8')
+            _cache.set(key, data)
+        return data
+
+    def text(self, name: str) -> str:
+        return self.data(name).decode('utf-8')
@@ -0,0 +1,59 @@
+from typing import NamedTuple
+import io
+import subprocess
+from pydub import AudioSegment
+from .metrics import timed
+from config.settings import AUDIO_CODEC, AUDIO_SAMPLE_RATE, AUDIO_BITRATE
+
+# 編碼名稱 -> (ffmpeg 輸出格式, ffmpeg 編碼器, 副檔名, 是否有損)
+CODECS = {
+    "wav": ("wav", None, "wav", False),
+    "flac": ("flac", "flac", "flac", False),
+    "opus": ("ogg", "libopus", "ogg", True),
+    "mp3": ("mp3", "libmp3lame", "mp3", True),
+}
+
+class EncodedChunk(NamedTuple):
+    data: bytes
+    filename: str
+    raw_bytes: int  # 編碼前的 PCM 大小
+    encoded_bytes: int  # 實際上傳的大小
+
+def encode_chunk(
+    chunk: AudioSegment,
+    codec: str = AUDIO_CODEC,
+    sample_rate: int = AUDIO_SAMPLE_RATE,
+    bitrate: str = AUDIO_BITRATE
+) -> EncodedChunk:
+    """將音頻片段降為單聲道、重新取樣並編碼到記憶體中，不寫入暫存檔"""
+    if codec not in CODECS:
+        raise ValueError(f"不支援的音頻編碼：{codec}")
+    fmt, encoder, ext, lossy = CODECS[codec]
+    raw_bytes = len(chunk.raw_data)
+
+    with timed("encode") as span:
+        span["bytes_in"] = raw_bytes
+        if encoder is None:
+            buffer = io.BytesIO()
+            chunk.set_channels(1).set_frame_rate(sample_rate).export(buffer, format="wav")
+            data = buffer.getvalue()
+        else:
+            if chunk.sample_width != 2:
+                chunk = chunk.set_sample_width(2)
+            command = [
+                AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+                "-f", "s16le", "-ar", str(chunk.frame_rate), "-ac", str(chunk.channels), "-i", "pipe:0",
+                "-ac", "1", "-ar", str(sample_rate), "-c:a", encoder,
+            ]
+            if lossy:
+                command += ["-b:a", bitrate]
+            # 容器預設會寫入隨機的串流序號（ogg）與版本資訊，bitexact 讓相同音頻得到相同位元組，轉錄快取才能命中
+            command += ["-flags", "+bitexact", "-fflags", "+bitexact", "-f", fmt, "pipe:1"]
+            result = subprocess.run(command, input=chunk.raw_data, capture_output=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"音頻編碼失敗：{result.stderr.decode('utf-8', 'ignore').strip()}")
+            data = result.stdout
+
+        span["bytes_out"] = len(data)
+
+    return EncodedChunk(data, f"chunk.{ext}", raw_bytes, len(data))
@@ -1,19 +1,29 @@
-from tempfile import NamedTemporaryFile
-from typing import List
-from .openai_client import create_transcription
-from config.settings import CHUNK_SIZE
+from typing import List, Optional, Tuple
+from .transcriber import transcribe_chunks
+from .chunk_planner import plan_audio_chunks
+from .segment_store import SegmentStore
+from config.settings import TRANSCRIBE_WORKERS
 
-def split_audio(audio_data) -> List:
+def split_audio_with_offsets(audio_data) -> List[Tuple[int, object]]:
+    """在靜音處切割音頻，回傳 (原始位移毫秒, 音頻片段) 的列表"""
     return [
-        audio_data[i:i + CHUNK_SIZE]
-        for i in range(0, len(audio_data), CHUNK_SIZE)
+        (start, audio_data[start:end])
+        for start, end in plan_audio_chunks(audio_data)
     ]
 
-def process_audio_chunks(chunks: List) -> str:
-    transcript = ""
+def split_audio(audio_data) -> List:
+    return [chunk for _, chunk in split_audio_with_offsets(audio_data)]
+
+def process_audio_chunks(
+    client,
+    chunks: List,
+    max_workers: int = TRANSCRIBE_WORKERS,
+    segments: Optional[SegmentStore] = None
+) -> str:
+    """轉錄 split_audio 產生的連續片段，片段位移依序累加"""
+    offsets = []
+    position = 0
     for chunk in chunks:
-        with NamedTemporaryFile(suffix=".wav", delete=True) as f:
-            chunk.export(f.name, format="wav")
-            with open(f.name, "rb") as audio_file:
-                transcript += create_transcription(audio_file)
-    return transcript 
\ No newline at end of file
+        offsets.append((position, chunk))
+        position += len(chunk)
+    return transcribe_chunks(client, offsets, max_workers=max_workers, segments=segments)
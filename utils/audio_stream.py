@@ -0,0 +1,158 @@
+from collections import deque
+from tempfile import NamedTemporaryFile
+from typing import Iterable, Iterator, Optional, Tuple
+import os
+import shutil
+import subprocess
+import threading
+import numpy as np
+from pydub import AudioSegment
+from .chunk_planner import find_quiet_point
+from .metrics import instrument
+from .speech_trim import SilenceTrimmer
+from config.settings import AUDIO_SAMPLE_RATE, CHUNK_SIZE, CHUNK_TOLERANCE, STREAM_WINDOW_MS
+
+SAMPLE_WIDTH = 2  # 輸出 16-bit 單聲道 PCM
+READ_BLOCK = 1024 * 1024
+
+# MP4 容器的索引可能在檔尾，無法從管線邊讀邊解碼
+SEEKABLE_ONLY_SUFFIXES = ('.m4a', '.mp4', '.mov')
+
+def _feed(source, pipe, failures: list):
+    """
+    在背景執行緒中把檔案物件寫入 ffmpeg 的 stdin；讀取來源失敗時記錄例外
+    只有寫入端的管線已關閉（ffmpeg 結束或停止解碼）視為正常；來源被關閉（例如上傳被刪除）
+    時讀取拋出的 ValueError 須記錄，否則 ffmpeg 會把截斷的音頻當成完整檔案
+    """
+    try:
+        while True:
+            try:
+                data = source.read(READ_BLOCK)
+            except Exception as e:
+                failures.append(e)
+                return
+            if not data:
+                return
+            try:
+                pipe.write(data)
+            except (BrokenPipeError, ValueError):
+                return
+    finally:
+        try:
+            pipe.close()
+        except BrokenPipeError:
+            pass
+
+def _drain(pipe, lines: deque):
+    for line in pipe:
+        lines.append(line.decode('utf-8', 'ignore').strip())
+
+@instrument("decode")
+def iter_pcm_windows(
+    source,
+    window_ms: int = STREAM_WINDOW_MS,
+    sample_rate: int = AUDIO_SAMPLE_RATE,
+    live: bool = False
+) -> Iterator[bytes]:
+    """
+    以 ffmpeg 串流解碼音源，逐次產生固定長度的 16-bit 單聲道 PCM
+    source 可以是檔案路徑或檔案物件（例如 Streamlit 的 UploadedFile）
+    live 為 True 時縮短 ffmpeg 的格式偵測與緩衝，讓持續增長的來源能立即輸出
+    """
+    spool = None
+    feed = None
+    if isinstance(source, (str, os.PathLike)):
+        input_arg = os.fspath(source)
+    elif getattr(source, 'name', '').lower().endswith(SEEKABLE_ONLY_SUFFIXES):
+        spool = NamedTemporaryFile(suffix=os.path.splitext(source.name)[1])
+        shutil.copyfileobj(source, spool, READ_BLOCK)
+        spool.flush()
+        input_arg = spool.name
+    else:
+        input_arg, feed = "pipe:0", source
+
+    command = [AudioSegment.converter, "-hide_banner", "-loglevel", "error"]
+    if live:
+        command += ["-probesize", "32768", "-analyzeduration", "0", "-fflags", "nobuffer"]
+    command += [
+        "-i", input_arg,
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1",
+    ]
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if feed is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    errors = deque(maxlen=20)
+    failures = []
+    threads = [threading.Thread(target=_drain, args=(process.stderr, errors), daemon=True)]
+    if feed is not None:
+        threads.append(threading.Thread(target=_feed, args=(feed, process.stdin, failures), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    window_bytes = sample_rate * window_ms // 1000 * SAMPLE_WIDTH
+    try:
+        while True:
+            data = process.stdout.read(window_bytes)
+            if not data:
+                break
+            yield data
+        # 來源中途失敗（例如上傳中斷）時不可把截斷的音頻當成完整結果
+        if failures:
+            raise failures[0]
+        if process.wait() != 0:
+            raise RuntimeError(f"音頻解碼失敗：{' '.join(errors)}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        if spool is not None:
+            spool.close()
+
+def stream_audio_chunks(
+    source,
+    target_ms: int = CHUNK_SIZE,
+    tolerance_ms: int = CHUNK_TOLERANCE,
+    sample_rate: int = AUDIO_SAMPLE_RATE,
+    trimmer: Optional[SilenceTrimmer] = None,
+    windows: Optional[Iterable[bytes]] = None
+) -> Iterator[Tuple[int, AudioSegment]]:
+    """
+    邊解碼邊在靜音處切割音頻，產生 (原始位移毫秒, 音頻片段)
+    記憶體用量只與單一片段長度有關，與整個檔案長度無關
+    提供 trimmer 時先移除長靜音再切割，位移為裁剪後的時間，以 trimmer.offsets 換回原始時間軸
+    windows 為已解碼的 PCM 視窗（例如即時錄音），提供時不再解碼 source
+    """
+    target = sample_rate * target_ms // 1000
+    tolerance = sample_rate * tolerance_ms // 1000
+    buffer = bytearray()
+    offset = 0
+
+    def make_segment(data) -> AudioSegment:
+        return AudioSegment(data=bytes(data), sample_width=SAMPLE_WIDTH, frame_rate=sample_rate, channels=1)
+
+    def trimmed() -> Iterator[bytes]:
+        pcm = windows if windows is not None else iter_pcm_windows(source, sample_rate=sample_rate)
+        for window in pcm:
+            yield trimmer.feed(window) if trimmer is not None else window
+        if trimmer is not None:
+            yield trimmer.flush()
+
+    for window in trimmed():
+        buffer.extend(window)
+        while len(buffer) // SAMPLE_WIDTH > target + tolerance:
+            region_start = target - tolerance
+            region = np.frombuffer(
+                bytes(buffer[region_start * SAMPLE_WIDTH:(target + tolerance) * SAMPLE_WIDTH]),
+                dtype=np.int16
+            )
+            cut = region_start + find_quiet_point(region, sample_rate, 1, 0, len(region))
+            yield offset * 1000 // sample_rate, make_segment(buffer[:cut * SAMPLE_WIDTH])
+            del buffer[:cut * SAMPLE_WIDTH]
+            offset += cut
+
+    if buffer:
+        yield offset * 1000 // sample_rate, make_segment(buffer)
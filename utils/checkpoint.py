@@ -0,0 +1,130 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+from config.settings import CHECKPOINT_DIR, CHECKPOINT_RETENTION
+
+HASH_BLOCK = 1024 * 1024
+
+def compute_run_id(source, **settings) -> Optional[str]:
+    """
+    以音檔內容與影響結果的設定產生執行編號，同一檔案重新處理時會得到相同編號
+    source 為路徑、支援 getbuffer() 的記憶體檔案（例如 Streamlit 的 UploadedFile），
+    或帶有 run_key 的串流來源（例如上傳中的檔案）；其他來源回傳 None
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            while block := f.read(HASH_BLOCK):
+                digest.update(block)
+    elif hasattr(source, "getbuffer"):
+        digest.update(source.getbuffer())
+    elif getattr(source, "run_key", None):
+        digest.update(source.run_key.encode('utf-8'))
+    else:
+        return None
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+class RunManifest:
+    """
+    執行檢查點：以只附加的 JSON Lines 檔記錄已完成的音頻片段與下游階段
+    中斷或重跑時讀回紀錄，從最後完成的單位繼續
+    """
+
+    def __init__(self, run_id: str, directory: str = CHECKPOINT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        _prune(directory)
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"{run_id}.jsonl")
+        self.chunks: Dict[int, dict] = {}
+        self.units: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 寫到一半中斷的最後一行
+                    continue
+                if record["type"] == "chunk":
+                    self.chunks[record["index"]] = record
+                else:
+                    self.units[record["key"]] = record["value"]
+
+    def _append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding='utf-8') as f:
+                f.write(line)
+
+    def get_chunk(self, index: int, offset_ms: int) -> Optional[Tuple[str, List[Tuple[float, float, str]]]]:
+        """取得已完成片段的 (文字, 時間戳片段)；位移不符時視為未完成"""
+        record = self.chunks.get(index)
+        if record is None or record["offset_ms"] != offset_ms:
+            return None
+        return record["text"], [tuple(segment) for segment in record["segments"]]
+
+    def save_chunk(self, index: int, offset_ms: int, text: str, segments: List[Tuple[float, float, str]]):
+        record = {"type": "chunk", "index": index, "offset_ms": offset_ms, "text": text, "segments": segments}
+        self.chunks[index] = record
+        self._append(record)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.units.get(key, default)
+
+    def save(self, key: str, value: Any):
+        self.units[key] = value
+        self._append({"type": "unit", "key": key, "value": value})
+
+    def memoize(self, key: str, create: Callable[[], Any]) -> Any:
+        """已完成的單位直接回傳紀錄，否則執行 create 並記錄結果"""
+        if key in self.units:
+            return self.units[key]
+        value = create()
+        self.save(key, value)
+        return value
+
+    def stage_memo(self) -> "StageMemo":
+        return StageMemo(self)
+
+class StageMemo:
+    """讓 Pipeline 的 memo 寫入檢查點，管線階段在重跑時可直接沿用"""
+
+    def __init__(self, manifest: RunManifest):
+        self.manifest = manifest
+
+    def _key(self, name: str) -> str:
+        return f"stage:{name}"
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = self.manifest.get(self._key(name))
+        return tuple(value) if value is not None else default
+
+    def __getitem__(self, name: str) -> Any:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name: str, value: Tuple[str, Any]):
+        self.manifest.save(self._key(name), list(value))
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+def _prune(directory: str):
+    """清除過舊的檢查點"""
+    cutoff = time.time() - CHECKPOINT_RETENTION
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".jsonl") and entry.stat().st_mtime < cutoff:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,84 @@
+from typing import List, Tuple
+import numpy as np
+from .metrics import instrument
+from config.settings import CHUNK_SIZE, CHUNK_TOLERANCE, ENERGY_FRAME_MS, QUIET_WINDOW_MS
+
+_SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+def audio_segment_samples(audio) -> np.ndarray:
+    """取得 AudioSegment 的原始 PCM 樣本（交錯排列，不複製資料）"""
+    dtype = _SAMPLE_DTYPES.get(audio.sample_width)
+    if dtype is None:
+        return np.array(audio.get_array_of_samples())
+    return np.frombuffer(audio.raw_data, dtype=dtype)
+
+def frame_energy(samples: np.ndarray, channels: int, frame_len: int) -> np.ndarray:
+    """以向量化方式計算每個音框的平均能量（所有聲道合併）"""
+    n_frames = len(samples) // (frame_len * channels)
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_len * channels].reshape(n_frames, -1).astype(np.float32)
+    return np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+
+@instrument("chunk_plan")
+def find_quiet_point(
+    samples: np.ndarray,
+    frame_rate: int,
+    channels: int,
+    start: int,
+    end: int,
+    frame_ms: int = ENERGY_FRAME_MS,
+    smooth_ms: int = QUIET_WINDOW_MS
+) -> int:
+    """在 [start, end) 樣本框範圍內找出最安靜的位置，回傳樣本框索引"""
+    frame_len = max(1, frame_rate * frame_ms // 1000)
+    energy = frame_energy(samples[start * channels:end * channels], channels, frame_len)
+    if len(energy) == 0:
+        return (start + end) // 2
+
+    # 以滑動平均找出持續較久的停頓，而不是單一安靜音框
+    width = min(len(energy), max(1, smooth_ms // frame_ms))
+    cumsum = np.concatenate(([0.0], np.cumsum(energy, dtype=np.float64)))
+    smoothed = (cumsum[width:] - cumsum[:-width]) / width
+    best = int(np.argmin(smoothed)) + width // 2
+    return start + best * frame_len + frame_len // 2
+
+def plan_chunks(
+    samples: np.ndarray,
+    frame_rate: int,
+    channels: int = 1,
+    target_ms: int = CHUNK_SIZE,
+    tolerance_ms: int = CHUNK_TOLERANCE
+) -> List[Tuple[int, int]]:
+    """
+    規劃音頻切點：在每個目標長度前後的容許範圍內選擇最安靜的位置
+    回傳 (開始毫秒, 結束毫秒) 的列表，皆為相對原始音頻的位移
+    只計算容許範圍內的能量，因此多小時的音檔也能快速完成
+    """
+    total = len(samples) // channels
+    target = frame_rate * target_ms // 1000
+    tolerance = frame_rate * tolerance_ms // 1000
+    to_ms = lambda frame: frame * 1000 // frame_rate
+
+    boundaries = []
+    start = 0
+    while total - start > target + tolerance:
+        cut = find_quiet_point(
+            samples, frame_rate, channels,
+            start + target - tolerance, start + target + tolerance
+        )
+        boundaries.append((to_ms(start), to_ms(cut)))
+        start = cut
+    if total > start:
+        boundaries.append((to_ms(start), to_ms(total)))
+    return boundaries
+
+def plan_audio_chunks(audio, target_ms: int = CHUNK_SIZE, tolerance_ms: int = CHUNK_TOLERANCE) -> List[Tuple[int, int]]:
+    """為 AudioSegment 規劃切點"""
+    return plan_chunks(
+        audio_segment_samples(audio),
+        audio.frame_rate,
+        audio.channels,
+        target_ms=target_ms,
+        tolerance_ms=tolerance_ms
+    )
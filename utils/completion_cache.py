@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+from .disk_cache import DiskCache
+from config.settings import CACHE_DIR, COMPLETION_CACHE_TTL, COMPLETION_CACHE_MAX_ENTRIES, COMPLETION_CACHE_MAX_BYTES
+
+def completion_cache_key(model: str, messages: List[dict], params: dict) -> str:
+    """以 (模型, 訊息, 參數) 的標準化 JSON 產生快取鍵"""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class CompletionCache:
+    """
+    聊天完成的快取層：記憶體 LRU + 選用的磁碟快取，皆有 TTL
+    相同的請求同時進來時只會送出一次上游呼叫，其他呼叫者等待同一個結果
+    """
+
+    def __init__(
+        self,
+        ttl: float = COMPLETION_CACHE_TTL,
+        max_entries: int = COMPLETION_CACHE_MAX_ENTRIES,
+        disk: Optional[DiskCache] = None
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: str):
+        self._memory[key] = (time.time() + self.ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._get_memory(key)
+        if value is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                value = data.decode('utf-8')
+                with self._lock:
+                    self._set_memory(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._set_memory(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value.encode('utf-8'))
+
+    def get_or_create(self, key: str, create: Callable[[], str]) -> str:
+        """取得快取結果；未命中時由第一個呼叫者執行 create，其餘相同請求等待其結果"""
+        value = self.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            # 前一個執行者可能在 get() 之後才完成並移出 _inflight，需在鎖內再查一次，避免重複呼叫上游
+            value = self._get_memory(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = create()
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self._memory),
+            }
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+def get_completion_cache() -> CompletionCache:
+    """取得程序內共用的聊天完成快取"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            disk = None
+            if COMPLETION_CACHE_MAX_BYTES > 0:
+                disk = DiskCache(
+                    os.path.join(CACHE_DIR, "completions.sqlite3"),
+                    COMPLETION_CACHE_MAX_BYTES,
+                    ttl=COMPLETION_CACHE_TTL
+                )
+            _cache = CompletionCache(disk=disk)
+        return _cache
@@ -1,14 +1,23 @@
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import MediaIoBaseUpload, build_http
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
 import streamlit as st
 import os
 import io
 import pickle
+import threading
+from config.settings import DRIVE_UPLOAD_WORKERS, DRIVE_CHUNK_SIZE, DRIVE_API_ENDPOINT
 
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+Content = Union[str, bytes]
 
 def authenticate_google_drive():
     """Google Drive 認證"""
@@ -31,30 +40,152 @@ def authenticate_google_drive():
     
     return creds
 
+# 每組憑證共用一個 Drive 服務物件與匯出器，不在每次上傳時重新建立
+_exporters: Dict[int, "DriveExporter"] = {}
+_exporters_lock = threading.Lock()
+
+def build_drive_service(creds, endpoint: Optional[str] = DRIVE_API_ENDPOINT):
+    """
+    建立 Drive v3 服務物件；使用套件內建的 API 描述，不需連線下載
+    endpoint 可指向本機的 Drive API 替身；creds 為 None 時不授權（不會改用環境中的預設憑證）
+    """
+    client_options = {'api_endpoint': endpoint} if endpoint else None
+    auth = {'credentials': creds} if creds is not None else {'http': build_http()}
+    return build(
+        'drive', 'v3',
+        **auth,
+        static_discovery=True,
+        cache_discovery=False,
+        client_options=client_options
+    )
+
+class DriveExporter:
+    """
+    將一次執行的所有產出檔並行上傳到 Google Drive
+    服務物件只建立一次；httplib2 連線不是執行緒安全的，因此每個上傳執行緒使用各自的連線
+    """
+
+    def __init__(
+        self,
+        creds=None,
+        service=None,
+        chunk_size: int = DRIVE_CHUNK_SIZE,
+        max_workers: int = DRIVE_UPLOAD_WORKERS,
+        endpoint: Optional[str] = DRIVE_API_ENDPOINT
+    ):
+        self.creds = creds
+        self.endpoint = endpoint
+        self.service = service if service is not None else build_drive_service(creds, endpoint)
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._folders: Dict[Tuple[str, Optional[str]], str] = {}
+        self._folder_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _http(self):
+        """取得目前執行緒專用的（已授權）HTTP 連線"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            # build_http 不把續傳上傳的 308 當成重新導向
+            http = build_http()
+            if self.creds is not None:
+                http = AuthorizedHttp(self.creds, http=http)
+            self._local.http = http
+        return http
+
+    def ensure_folder(self, name: str, parent_id: Optional[str] = None) -> str:
+        """取得或建立目的資料夾；同一名稱只查詢與建立一次"""
+        key = (name, parent_id)
+        with self._folder_lock:
+            if key in self._folders:
+                return self._folders[key]
+            escaped = name.replace('\\', '\\\\').replace("'", "\\'")
+            query = f"mimeType='{FOLDER_MIME_TYPE}' and name='{escaped}' and trashed=false"
+            if parent_id:
+                query += f" and '{parent_id}' in parents"
+            found = self.service.files().list(
+                q=query, spaces='drive', fields='files(id)', pageSize=1
+            ).execute(http=self._http()).get('files', [])
+            if found:
+                folder_id = found[0]['id']
+            else:
+                metadata = {'name': name, 'mimeType': FOLDER_MIME_TYPE}
+                if parent_id:
+                    metadata['parents'] = [parent_id]
+                folder_id = self.service.files().create(
+                    body=metadata, fields='id'
+                ).execute(http=self._http())['id']
+            self._folders[key] = folder_id
+            return folder_id
+
+    def upload(self, filename: str, content: Content, mime_type: str, folder_id: Optional[str] = None) -> Optional[str]:
+        """
+        上傳單一檔案並回傳 webViewLink
+        超過 chunk_size 的檔案以續傳方式分塊上傳，較小的檔案以單一請求上傳
+        """
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        metadata = {'name': filename}
+        if folder_id:
+            metadata['parents'] = [folder_id]
+        resumable = len(data) > self.chunk_size
+        media = MediaIoBaseUpload(
+            io.BytesIO(data), mimetype=mime_type, chunksize=self.chunk_size, resumable=resumable
+        )
+        request = self.service.files().create(body=metadata, media_body=media, fields='id, webViewLink')
+        if self.endpoint:
+            # 覆寫端點時上傳網址只換主機、保留 https，指向 http 的本機替身時需一併換掉通訊協定
+            request.uri = urlparse(request.uri)._replace(scheme=urlparse(self.endpoint).scheme).geturl()
+        http = self._http()
+        if not resumable:
+            return request.execute(http=http).get('webViewLink')
+        response = None
+        while response is None:
+            _, response = request.next_chunk(http=http)
+        return response.get('webViewLink')
+
+    def export(
+        self,
+        artifacts: Dict[str, Tuple[Content, str]],
+        folder_name: Optional[str] = None,
+        parent_id: Optional[str] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        並行上傳 {檔名: (內容, MIME 類型)}，回傳 {檔名: webViewLink}
+        Drive 的批次請求不支援媒體上傳，因此以執行緒池同時送出
+        """
+        folder_id = self.ensure_folder(folder_name, parent_id) if folder_name else parent_id
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(artifacts)))) as executor:
+            futures = {
+                filename: executor.submit(self.upload, filename, content, mime_type, folder_id)
+                for filename, (content, mime_type) in artifacts.items()
+            }
+            return {filename: future.result() for filename, future in futures.items()}
+
+def get_drive_exporter(creds) -> DriveExporter:
+    """取得該憑證共用的匯出器"""
+    with _exporters_lock:
+        exporter = _exporters.get(id(creds))
+        if exporter is None or exporter.creds is not creds:
+            exporter = DriveExporter(creds)
+            _exporters[id(creds)] = exporter
+        return exporter
+
 def upload_to_drive(file_content, filename, mime_type, folder_id=None):
     """上傳檔案到 Google Drive"""
     try:
         creds = authenticate_google_drive()
-        service = build('drive', 'v3', credentials=creds)
-        
-        # 準備檔案元數據
-        file_metadata = {'name': filename}
-        if folder_id:
-            file_metadata['parents'] = [folder_id]
-        
-        # 創建媒體上傳物件
-        fh = io.BytesIO(file_content.encode('utf-8') if isinstance(file_content, str) else file_content)
-        media = MediaIoBaseUpload(fh, mimetype=mime_type, resumable=True)
-        
-        # 執行上傳
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, webViewLink'
-        ).execute()
-        
-        return file.get('webViewLink')
-        
+        return get_drive_exporter(creds).upload(filename, file_content, mime_type, folder_id)
+
+    except Exception as e:
+        st.error(f"上傳到 Google Drive 時發生錯誤: {str(e)}")
+        return None
+
+def export_to_drive(artifacts: Dict[str, Tuple[Content, str]], folder_name: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """一次上傳所有產出檔到同一個資料夾，回傳 {檔名: 連結}"""
+    try:
+        creds = authenticate_google_drive()
+        return get_drive_exporter(creds).export(artifacts, folder_name)
+
     except Exception as e:
         st.error(f"上傳到 Google Drive 時發生錯誤: {str(e)}")
-        return None 
\ No newline at end of file
+        return {}
@@ -0,0 +1,158 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+import traceback
+import uuid
+from config.settings import JOB_WORKERS, STREAMING_JOB_WORKERS, JOB_QUEUE_DEPTH, JOB_RETENTION, JOB_MAX_EVENTS
+
+class QueueFullError(Exception):
+    """排隊中的工作已達上限"""
+
+FINISHED = ("succeeded", "failed")
+
+class Job:
+    """背景工作的狀態、各階段進度與事件紀錄（供 Server-Sent Events 逐一推送）"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"  # queued / running / succeeded / failed
+        self.stages: Dict[str, dict] = {}
+        self.result: Any = None
+        self.artifacts = None  # 工作完成後的 ArtifactStore，供下載端點使用
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.updated = self.created
+        # (事件編號, 事件)；編號持續遞增，捨棄舊事件後仍可作為 Last-Event-ID
+        self.events: "deque[Tuple[int, dict]]" = deque(maxlen=JOB_MAX_EVENTS)
+        self._next_event = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def _publish(self, event: str, **data):
+        # 呼叫端需持有 self._lock
+        self.events.append((self._next_event, {"event": event, **data}))
+        self._next_event += 1
+        self.updated = time.time()
+        self._changed.notify_all()
+
+    def publish(self, event: str, **data):
+        """加入一筆事件，例如模型輸出的文字片段"""
+        with self._lock:
+            self._publish(event, **data)
+
+    def set_status(self, status: str):
+        with self._lock:
+            self.status = status
+            if status in FINISHED:
+                # 工作結束後完整結果可由結果端點取得，不再保留逐段的模型輸出
+                self.events = deque(
+                    ((index, event) for index, event in self.events if event["event"] != "token"),
+                    maxlen=JOB_MAX_EVENTS
+                )
+            self._publish("status", status=status, error=self.error)
+
+    def update_stage(self, name: str, status: str, **details):
+        """更新階段狀態，details 可包含 progress、completed 等進度資訊"""
+        with self._lock:
+            stage = self.stages.setdefault(name, {})
+            stage.update(details, status=status)
+            self._publish("stage", name=name, **stage)
+
+    def wait_events(self, start: int, timeout: float) -> Tuple[List[Tuple[int, dict]], bool]:
+        """
+        取得編號 start 以後仍保留的事件；沒有新事件時最多等待 timeout 秒
+        回傳 ([(事件編號, 事件)], 工作是否已結束)
+        """
+        with self._changed:
+            if self._next_event <= start and self.status not in FINISHED:
+                self._changed.wait(timeout)
+            return [(index, event) for index, event in self.events if index >= start], self.status in FINISHED
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "error": self.error,
+                "created": self.created,
+                "updated": self.updated,
+            }
+
+class JobManager:
+    """
+    以有限的工作執行緒處理背景工作
+    排隊數超過 max_queue 時拒絕新工作，讓 API 在過載時回應 503 而不是無限排隊
+    讀取上傳中檔案的工作可能長時間等待用戶端，另用獨立的執行緒池，不佔用一般工作的執行緒
+    """
+
+    def __init__(
+        self,
+        max_workers: int = JOB_WORKERS,
+        max_queue: int = JOB_QUEUE_DEPTH,
+        retention: float = JOB_RETENTION,
+        streaming_workers: int = STREAMING_JOB_WORKERS
+    ):
+        self.max_queue = max_queue
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._streaming_executor = ThreadPoolExecutor(max_workers=streaming_workers, thread_name_prefix="stream-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def queued(self) -> int:
+        with self._lock:
+            return sum(job.status == "queued" for job in self._jobs.values())
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args,
+        on_done: Optional[Callable[[Job], None]] = None,
+        streaming: bool = False
+    ) -> Job:
+        """
+        送出工作；func 的第一個參數為 Job，可用來回報進度
+        on_done 在工作結束後以 Job 呼叫；streaming 為 True 表示工作會等待仍在上傳的資料
+        """
+        self._prune()
+        job = Job()
+        with self._lock:
+            if sum(j.status == "queued" for j in self._jobs.values()) >= self.max_queue:
+                raise QueueFullError("目前排隊的工作已滿，請稍後再試")
+            self._jobs[job.id] = job
+        executor = self._streaming_executor if streaming else self._executor
+        executor.submit(self._run, job, func, args, on_done)
+        return job
+
+    def _run(self, job: Job, func, args, on_done):
+        job.set_status("running")
+        try:
+            job.result = func(job, *args)
+            job.set_status("succeeded")
+        except Exception as e:
+            job.error = str(e) or traceback.format_exc(limit=1)
+            job.set_status("failed")
+        finally:
+            if on_done:
+                on_done(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        """移除保留時間已過的完成工作"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for job_id in [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in FINISHED and job.updated < cutoff
+            ]:
+                del self._jobs[job_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._streaming_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,353 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+import threading
+import time
+from .audio_stream import iter_pcm_windows, stream_audio_chunks, SAMPLE_WIDTH
+from .processing import make_trimmer
+from .subtitle_generator import format_time
+from .text_processor import translate_in_chunks, update_key_points
+from .transcriber import Segment, transcribe_chunk
+from .transcript_cache import get_transcript_cache
+from config.settings import (
+    AUDIO_SAMPLE_RATE, CHAT_MODEL, LIVE_WINDOW_MS, LIVE_CHUNK_MS, LIVE_CHUNK_TOLERANCE,
+    LIVE_WORKERS, LIVE_UPDATE_SECONDS, LIVE_IDLE_TIMEOUT, LIVE_RECENT_SEGMENTS, LIVE_RECENT_TRANSLATIONS
+)
+
+# 即時轉錄的產出檔名後綴，內容隨轉錄進度附加寫入
+LIVE_ARTIFACTS = {
+    'transcript': '.live.transcript.txt',
+    'srt': '.live.en.srt',
+    'translation_zh': '.live.zh.txt',
+    'key_points': '.live.key_points.txt',
+}
+
+class GrowingFileReader:
+    """
+    讀取仍在錄音中的檔案：讀到檔尾時等待新資料寫入
+    檔案超過 idle_timeout 秒未增長，或 stop 事件被設定時視為結束
+    只支援可串流解碼的格式（mp3、wav、ogg、flac、aac 等），m4a 需錄完才能解碼
+    """
+
+    def __init__(
+        self,
+        path: str,
+        idle_timeout: float = LIVE_IDLE_TIMEOUT,
+        poll_interval: float = 0.2,
+        stop: Optional[threading.Event] = None
+    ):
+        self._file = open(path, "rb")
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.stop = stop or threading.Event()
+
+    def read(self, size: int = -1) -> bytes:
+        idle_since = time.monotonic()
+        while not self.stop.is_set():
+            data = self._file.read(size)
+            if data:
+                return data
+            if time.monotonic() - idle_since >= self.idle_timeout:
+                break
+            self.stop.wait(self.poll_interval)
+        return b""
+
+    def close(self):
+        self._file.close()
+
+def follow_pcm(
+    path: str,
+    idle_timeout: float = LIVE_IDLE_TIMEOUT,
+    stop: Optional[threading.Event] = None,
+    window_ms: int = LIVE_WINDOW_MS,
+    sample_rate: int = AUDIO_SAMPLE_RATE
+) -> Iterator[bytes]:
+    """邊錄音邊解碼：持續讀取增長中的檔案，產生 16-bit 單聲道 PCM 視窗"""
+    reader = GrowingFileReader(path, idle_timeout, stop=stop)
+    try:
+        yield from iter_pcm_windows(reader, window_ms=window_ms, sample_rate=sample_rate, live=True)
+    finally:
+        reader.close()
+
+def replay_pcm(
+    path: str,
+    speed: float = 1.0,
+    stop: Optional[threading.Event] = None,
+    window_ms: int = LIVE_WINDOW_MS,
+    sample_rate: int = AUDIO_SAMPLE_RATE
+) -> Iterator[bytes]:
+    """
+    以實際播放速度重播本機音檔（speed 為倍速），用來在沒有錄音設備時測試即時轉錄
+    解碼可以超前，但每個視窗要等到它在播放時間軸上「錄到」時才產生
+    """
+    start = time.monotonic()
+    played = 0.0
+    for window in iter_pcm_windows(path, window_ms=window_ms, sample_rate=sample_rate):
+        played += len(window) / SAMPLE_WIDTH / sample_rate
+        delay = start + played / speed - time.monotonic()
+        if stop is not None:
+            if stop.wait(max(0.0, delay)):
+                return
+        elif delay > 0:
+            time.sleep(delay)
+        yield window
+
+class LiveTranscriber:
+    """
+    即時轉錄：音訊累積到 chunk_ms 左右即在靜音處切出片段轉錄，依序附加到逐字稿與字幕
+    中文翻譯與重點整理每隔 update_seconds 只以新增的逐字稿增量更新，不從頭重做
+    完整內容隨進度附加寫入 output_base 開頭的檔案；記憶體中只保留最近的片段與翻譯，
+    因此用量與錄音長度無關
+    """
+
+    def __init__(
+        self,
+        client,
+        system_prompt: str = "",
+        model: str = CHAT_MODEL,
+        output_base: Optional[str] = None,
+        chunk_ms: int = LIVE_CHUNK_MS,
+        tolerance_ms: int = LIVE_CHUNK_TOLERANCE,
+        max_workers: int = LIVE_WORKERS,
+        update_seconds: float = LIVE_UPDATE_SECONDS,
+        recent_segments: int = LIVE_RECENT_SEGMENTS,
+        recent_translations: int = LIVE_RECENT_TRANSLATIONS,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        on_update: Optional[Callable[[dict], None]] = None,
+        heartbeat_timeout: Optional[float] = None
+    ):
+        self.client = client
+        self.system_prompt = system_prompt
+        self.model = model
+        self.output_base = output_base
+        self.chunk_ms = chunk_ms
+        self.tolerance_ms = tolerance_ms
+        self.max_workers = max(1, max_workers)
+        self.update_seconds = update_seconds
+        self.sample_rate = sample_rate
+        self.on_update = on_update
+        self.heartbeat_timeout = heartbeat_timeout
+        self.stop_event = threading.Event()
+        self.recent: Deque[Segment] = deque(maxlen=recent_segments)
+        self.translations: Deque[str] = deque(maxlen=recent_translations)
+        self.key_points = ""
+        self.received_seconds = 0.0  # 已收到的原始音訊長度
+        self.transcribed_seconds = 0.0  # 逐字稿已涵蓋到的原始時間
+        self.chunks = 0
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._pending: Deque[Tuple[Future, float, float]] = deque()
+        self._done_trimmed = 0.0  # 已轉錄到的裁剪後時間
+        self._new_text: List[str] = []
+        self._last_update = time.monotonic()
+        self._last_seen = time.monotonic()
+        self._text_job: Optional[Future] = None
+        self._text_pool: Optional[ThreadPoolExecutor] = None
+        self._files: Dict[str, object] = {}
+        self._cue = 0
+        self._trimmer = None
+
+    def stop(self):
+        """停止讀取新的音訊；已送出的片段仍會完成"""
+        self.stop_event.set()
+
+    def touch(self):
+        """標記仍有人在看；設定 heartbeat_timeout 時，超過該秒數未呼叫即自動停止"""
+        self._last_seen = time.monotonic()
+
+    @property
+    def lag_seconds(self) -> float:
+        """
+        逐字稿落後已收到音訊的秒數
+        裁剪靜音時只計算尚未轉錄的語音，被移除的長靜音不算落後
+        """
+        if self._trimmer is not None:
+            return max(0.0, self._trimmer.offsets.trimmed_duration - self._done_trimmed)
+        return max(0.0, self.received_seconds - self._done_trimmed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "received_seconds": round(self.received_seconds, 2),
+                "transcribed_seconds": round(self.transcribed_seconds, 2),
+                "lag_seconds": round(self.lag_seconds, 2),
+                "chunks": self.chunks,
+                "segments": self._cue,
+                "recent": list(self.recent),
+                "translation_zh": "\n\n".join(self.translations),
+                "key_points": self.key_points,
+                "speech_trim": self._trimmer.offsets.to_dict() if self._trimmer is not None else None,
+                "finished": self.finished,
+                "error": str(self.error) if self.error else None,
+            }
+
+    def _notify(self):
+        # 在鎖內呼叫，回呼依序執行、不會同時被兩個執行緒呼叫
+        if self.on_update is not None:
+            with self._lock:
+                self.on_update(self.snapshot())
+
+    def _open_outputs(self):
+        if not self.output_base:
+            return
+        for name, suffix in LIVE_ARTIFACTS.items():
+            if name != 'key_points':
+                self._files[name] = open(self.output_base + suffix, "w", encoding='utf-8')
+
+    def _write(self, name: str, text: str):
+        f = self._files.get(name)
+        if f is not None:
+            f.write(text)
+            f.flush()
+
+    def _track(self, windows: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        記錄已收到的音訊長度並移除長靜音，停止時結束讀取
+        時間軸對應同時被轉錄完成的回呼讀取，因此裁剪在鎖內進行
+        """
+        for window in windows:
+            if self.heartbeat_timeout and time.monotonic() - self._last_seen > self.heartbeat_timeout:
+                self.stop()
+            if self.stop_event.is_set():
+                break
+            with self._lock:
+                self.received_seconds += len(window) / SAMPLE_WIDTH / self.sample_rate
+                if self._trimmer is not None:
+                    window = self._trimmer.feed(window)
+            yield window
+        if self._trimmer is not None:
+            with self._lock:
+                rest = self._trimmer.flush()
+            yield rest
+
+    def _to_original(self, seconds: float, end: bool = False) -> float:
+        if self._trimmer is None:
+            return seconds
+        return float(self._trimmer.offsets.to_original(seconds, end=end))
+
+    def _on_done(self, _future: Future):
+        """片段完成時由轉錄執行緒呼叫；只依原始順序處理已完成的前綴"""
+        with self._lock:
+            while self._pending and self._pending[0][0].done():
+                future, offset, duration = self._pending.popleft()
+                self._done_trimmed = offset + duration
+                if future.exception() is not None:
+                    self.error = self.error or future.exception()
+                    continue
+                self._append(offset, *future.result()[:2])
+            self._maybe_update_text()
+            self._changed.notify_all()
+        self._notify()
+
+    def _append(self, offset: float, text: str, segments: List[Segment]):
+        self.chunks += 1
+        lines = []
+        for start, end, segment_text in segments:
+            segment_text = segment_text.strip()
+            if not segment_text:
+                continue
+            start = self._to_original(offset + start)
+            end = self._to_original(offset + end, end=True)
+            self._cue += 1
+            self.recent.append((start, end, segment_text))
+            self._write('srt', f"{self._cue}\n{format_time(start)} --> {format_time(end)}\n{segment_text}\n\n")
+            lines.append(segment_text)
+            self.transcribed_seconds = max(self.transcribed_seconds, end)
+        chunk_text = " ".join(lines) if lines else text.strip()
+        if chunk_text:
+            self._write('transcript', chunk_text + "\n")
+            self._new_text.append(chunk_text)
+        if self._trimmer is not None:
+            # 之後的片段都在此位移之後，較早的時間軸斷點不再需要
+            self._trimmer.offsets.discard_before(offset)
+
+    def _maybe_update_text(self, force: bool = False):
+        """距上次更新已超過 update_seconds 且前一次更新已完成時，送出新增文字的翻譯與重點更新"""
+        if not self._new_text or self._text_pool is None:
+            return
+        if self._text_job is not None and not self._text_job.done():
+            return
+        if not force and time.monotonic() - self._last_update < self.update_seconds:
+            return
+        new_text = " ".join(self._new_text)
+        self._new_text = []
+        self._last_update = time.monotonic()
+        self._text_job = self._text_pool.submit(self._update_text, new_text)
+
+    def _update_text(self, new_text: str):
+        # 翻譯只處理新增的文字；重點以上一版重點加上新文字更新，兩者長度都不隨錄音增長
+        try:
+            translation = translate_in_chunks(self.client, new_text, self.system_prompt, model=self.model)
+            key_points = "\n".join(update_key_points(
+                self.client, self.key_points, new_text, self.system_prompt, self.model
+            ))
+        except Exception as e:
+            with self._lock:
+                self.error = self.error or e
+            raise
+        with self._lock:
+            self.translations.append(translation)
+            self._write('translation_zh', translation + "\n\n")
+            self.key_points = key_points
+            if self.output_base:
+                with open(self.output_base + LIVE_ARTIFACTS['key_points'], "w", encoding='utf-8') as f:
+                    f.write(key_points)
+        self._notify()
+
+    def run(self, windows: Iterable[bytes]) -> dict:
+        """
+        處理 PCM 視窗直到來源結束或呼叫 stop()，並回傳最後的狀態
+        會阻塞呼叫端；在網頁介面中應於背景執行緒執行
+        """
+        cache = get_transcript_cache()
+        self._trimmer = make_trimmer()
+        self._open_outputs()
+        min_samples = self.sample_rate // 10  # Whisper 不接受過短的音訊
+        try:
+            with ThreadPoolExecutor(self.max_workers) as executor, ThreadPoolExecutor(1) as text_pool:
+                self._text_pool = text_pool
+                chunks = stream_audio_chunks(
+                    None, self.chunk_ms, self.tolerance_ms, self.sample_rate, windows=self._track(windows)
+                )
+                for offset_ms, chunk in chunks:
+                    if self.error is not None:
+                        raise self.error
+                    if chunk.frame_count() < min_samples:
+                        continue
+                    with self._changed:
+                        # 限制尚未完成的片段數，轉錄跟不上時不會無限累積音訊
+                        self._changed.wait_for(lambda: len(self._pending) < self.max_workers * 2)
+                        future = executor.submit(transcribe_chunk, self.client, chunk, cache=cache)
+                        self._pending.append((future, offset_ms / 1000, len(chunk) / 1000))
+                    future.add_done_callback(self._on_done)
+                with self._changed:
+                    self._changed.wait_for(lambda: not self._pending)
+                # 等前一次更新完成後，以剩餘的文字做最後一次更新
+                while True:
+                    with self._lock:
+                        job = self._text_job
+                        if job is None or job.done():
+                            self._maybe_update_text(force=True)
+                            job = self._text_job
+                            break
+                    job.exception()
+                if job is not None:
+                    job.result()
+                if self.error is not None:
+                    raise self.error
+        except BaseException as e:
+            with self._lock:
+                self.error = self.error or e
+                self._text_pool = None  # 結束中仍完成的片段不再送出文字更新
+            raise
+        finally:
+            self._text_pool = None
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+            with self._lock:
+                self.finished = True
+            self._notify()
+        return self.snapshot()
@@ -0,0 +1,191 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+import functools
+import inspect
+import threading
+import time
+
+T = TypeVar("T")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+BYTE_BUCKETS = tuple(1024 * 4 ** power for power in range(10))  # 1 KB 到 256 MB
+
+class Histogram:
+    """固定桶界的直方圖，依標籤分組"""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # 標籤 -> [各桶計數..., 總和, 次數]
+        self.series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, labels: LabelKey, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {series[-1]}"
+            yield f"{self.name}_sum{_labels(labels)} {series[-2]:.6f}"
+            yield f"{self.name}_count{_labels(labels)} {series[-1]}"
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.series: Dict[LabelKey, float] = {}
+
+    def inc(self, labels: LabelKey, value: float = 1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.series.items()):
+            yield f"{self.name}{_labels(labels)} {value:g}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _key(**labels) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+_lock = threading.Lock()
+STAGE_SECONDS = Histogram("whisper_stage_duration_seconds", "各處理階段耗時", DURATION_BUCKETS)
+STAGE_BYTES = Histogram("whisper_stage_bytes", "各處理階段輸入與輸出的位元組數", BYTE_BUCKETS)
+STAGE_ERRORS = Counter("whisper_stage_errors_total", "各處理階段失敗次數")
+TOKENS = Counter("whisper_openai_tokens_total", "OpenAI 回報的權杖用量")
+RETRIES = Counter("whisper_openai_retries_total", "OpenAI 呼叫重試次數")
+CACHE_REQUESTS = Counter("whisper_cache_requests_total", "快取查詢結果")
+_METRICS = (STAGE_SECONDS, STAGE_BYTES, STAGE_ERRORS, TOKENS, RETRIES, CACHE_REQUESTS)
+
+def _observe(stage: str, elapsed: float, span: dict):
+    with _lock:
+        STAGE_SECONDS.observe(_key(stage=stage), elapsed)
+        for direction in ("in", "out"):
+            size = span.get(f"bytes_{direction}")
+            if size is not None:
+                STAGE_BYTES.observe(_key(stage=stage, direction=direction), size)
+
+def _fail(stage: str):
+    with _lock:
+        STAGE_ERRORS.inc(_key(stage=stage))
+
+@contextmanager
+def timed(stage: str) -> Iterator[dict]:
+    """
+    量測區塊耗時並記錄到 stage 的直方圖
+    區塊內可在回傳的 dict 設定 bytes_in / bytes_out，一併記錄資料量
+    """
+    span: dict = {}
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException:
+        _fail(stage)
+        raise
+    finally:
+        _observe(stage, time.perf_counter() - start, span)
+
+def timed_iter(stage: str, iterable: Iterable[T]) -> Iterator[T]:
+    """
+    累計產生所有元素所花的時間，迭代結束時記錄一筆
+    不含呼叫端處理元素的時間，因此串流解碼與後續轉錄重疊時仍能分開量測
+    """
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except BaseException:
+                _fail(stage)
+                raise
+            finally:
+                elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        # 呼叫端提前停止時立即關閉內層產生器，讓它釋放子程序等資源
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+        _observe(stage, elapsed, {})
+
+def instrument(stage: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """以裝飾器記錄函式耗時；產生器函式改為計算產生元素的時間"""
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return timed_iter(stage, func(*args, **kwargs))
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with timed(stage):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_tokens(model: str, prompt_tokens: int, completion_tokens: int):
+    with _lock:
+        TOKENS.inc(_key(model=model, type="prompt"), prompt_tokens)
+        TOKENS.inc(_key(model=model, type="completion"), completion_tokens)
+
+def record_retry(kind: str, reason: str):
+    with _lock:
+        RETRIES.inc(_key(kind=kind, reason=reason))
+
+def record_cache(cache: str, hit: bool):
+    with _lock:
+        CACHE_REQUESTS.inc(_key(cache=cache, result="hit" if hit else "miss"))
+
+def render_prometheus() -> str:
+    """以 Prometheus 文字格式輸出所有指標"""
+    with _lock:
+        lines = [line for metric in _METRICS for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+def timing_snapshot() -> Dict[str, Tuple[int, float]]:
+    """各階段目前的 (次數, 總秒數)，供計算單次執行的耗時分布"""
+    with _lock:
+        snapshot: Dict[str, Tuple[int, float]] = {}
+        for labels, series in STAGE_SECONDS.series.items():
+            snapshot[dict(labels)["stage"]] = (series[-1], series[-2])
+        return snapshot
+
+def timing_breakdown(
+    before: Dict[str, Tuple[int, float]],
+    after: Optional[Dict[str, Tuple[int, float]]] = None
+) -> List[Tuple[str, int, float]]:
+    """兩次快照之間各階段的 (名稱, 次數, 總秒數)，依耗時由大到小排列"""
+    after = after if after is not None else timing_snapshot()
+    rows = []
+    for stage, (count, seconds) in after.items():
+        prev_count, prev_seconds = before.get(stage, (0, 0.0))
+        if count > prev_count:
+            rows.append((stage, count - prev_count, seconds - prev_seconds))
+    return sorted(rows, key=lambda row: row[2], reverse=True)
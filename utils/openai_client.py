@@ -1,28 +1,275 @@
-from openai import OpenAI
-from typing import List
-from tempfile import NamedTemporaryFile
+from openai import OpenAI, APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+import httpx
+from config.settings import (
+    TRANSCRIBE_MODEL, TRANSCRIBE_LANGUAGE, CHAT_MODEL,
+    OPENAI_MAX_CONNECTIONS, OPENAI_MAX_RETRIES, OPENAI_BACKOFF_BASE, OPENAI_BACKOFF_MAX, OPENAI_MAX_CONCURRENCY,
+    WHISPER_RPM, CHAT_RPM, CHAT_TPM, CHAT_OUTPUT_TOKENS_ESTIMATE
+)
+from .completion_cache import completion_cache_key, get_completion_cache
+from .rate_limiter import RateLimiter
+from .text_chunker import estimate_tokens
+from .checkpoint import RunManifest
+from .metrics import timed, record_cache, record_retry, record_tokens
+
+T = TypeVar("T")
 
 class AudioProcessor:
     def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
-        
-def init_openai(api_key: str):
-    return OpenAI(api_key=api_key)
+        self.client = init_openai(api_key)
+
+# 每個 API 金鑰共用一個客戶端（含 keep-alive 連線池）與一組速率限制
+_clients: Dict[str, OpenAI] = {}
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_pool_lock = threading.Lock()
+# 跨所有客戶端與執行緒的同時呼叫上限；退避等待期間不佔用名額
+_concurrency: Optional[threading.BoundedSemaphore] = (
+    threading.BoundedSemaphore(OPENAI_MAX_CONCURRENCY) if OPENAI_MAX_CONCURRENCY > 0 else None
+)
+
+def init_openai(api_key: str) -> OpenAI:
+    """取得該 API 金鑰共用的客戶端，跨 Streamlit 重跑與工作階段重複使用"""
+    with _pool_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(600.0, connect=10.0)
+            )
+            # 重試由 call_with_backoff 統一處理，以便遵守 Retry-After 並共用速率限制
+            client = OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+            _clients[api_key] = client
+        return client
+
+def set_max_concurrency(limit: int):
+    """設定同時進行的 API 呼叫上限，0 表示不限制；應在送出任何請求前呼叫"""
+    global _concurrency
+    _concurrency = threading.BoundedSemaphore(limit) if limit > 0 else None
+
+def get_rate_limiter(client: OpenAI, kind: str) -> RateLimiter:
+    """kind 為 whisper 或 chat，兩者分開計算"""
+    key = (client.api_key, kind)
+    with _pool_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(WHISPER_RPM) if kind == "whisper" else RateLimiter(CHAT_RPM, CHAT_TPM)
+            _limiters[key] = limiter
+        return limiter
+
+def get_rate_limit_stats() -> Dict[str, dict]:
+    """各類請求的節流與重試統計"""
+    with _pool_lock:
+        limiters = list(_limiters.items())
+    stats: Dict[str, dict] = {}
+    for (_, kind), limiter in limiters:
+        for name, value in limiter.stats().items():
+            stats.setdefault(kind, {}).setdefault(name, 0)
+            stats[kind][name] += value
+    return stats
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """讀取 Retry-After / retry-after-ms 標頭"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code >= 500 or error.status_code == 409)
+
+def call_with_backoff(
+    client: OpenAI,
+    kind: str,
+    call: Callable[[], T],
+    tokens: int = 0,
+    usage: Optional[Callable[[T], int]] = None
+) -> T:
+    """
+    在速率限制內執行 API 呼叫
+    429 與暫時性錯誤以帶隨機抖動的指數退避重試，伺服器提供 Retry-After 時優先遵守
+    """
+    limiter = get_rate_limiter(client, kind)
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        limiter.acquire(tokens)
+        try:
+            with _concurrency or nullcontext():
+                result = call()
+        except Exception as e:
+            if attempt == OPENAI_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * (2 ** attempt)))
+            limiter.record_retry(delay, isinstance(e, RateLimitError))
+            record_retry(kind, "rate_limit" if isinstance(e, RateLimitError) else "error")
+            time.sleep(delay)
+            continue
+        if usage is not None:
+            limiter.settle(tokens, usage(result))
+        return result
 
-def create_chat_completion(client: OpenAI, messages: List[dict], model: str = "gpt-4") -> str:
+def create_chat_completion(
+    client: OpenAI,
+    messages: List[dict],
+    model: str = CHAT_MODEL,
+    use_cache: bool = True,
+    manifest: Optional[RunManifest] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    **params
+) -> str:
     """
     使用指定的模型創建聊天完成
+    相同的 (模型, 訊息, 參數) 會由快取回傳，同時進行的相同請求只送出一次
+    提供 manifest 時，結果會記錄在執行檢查點中，重跑時不受快取淘汰影響
+    提供 on_token 時改以串流方式呼叫，每收到一段文字就以該段呼叫 on_token，仍回傳完整結果；
+    結果來自快取、檢查點或同時進行的相同請求時，以完整文字呼叫 on_token 一次
     """
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages
-    )
-    return response.choices[0].message.content.strip()
+    requested = []
+
+    def create() -> str:
+        requested.append(True)
+        if on_token is not None:
+            return stream_chat_completion(client, messages, model, on_token, **params)
+        estimated = sum(estimate_tokens(message["content"]) for message in messages) + CHAT_OUTPUT_TOKENS_ESTIMATE
+        response = call_with_backoff(
+            client, "chat",
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                **params
+            ),
+            tokens=estimated,
+            usage=lambda response: response.usage.total_tokens if response.usage else 0
+        )
+        if response.usage:
+            record_tokens(model, response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content.strip()
+
+    key = completion_cache_key(model, messages, params)
+    if use_cache:
+        cached_create = create
 
-def create_transcription(client: OpenAI, audio_file) -> str:
-    transcription = client.audio.transcriptions.create(
-        model="whisper-1",
-        file=audio_file,
-        language="en"
+        def create() -> str:
+            result = get_completion_cache().get_or_create(key, cached_create)
+            record_cache("completion", hit=not requested)
+            return result
+
+    with timed("chat"):
+        if manifest is not None:
+            result = manifest.memoize(f"chat:{key}", create)
+        else:
+            result = create()
+    if on_token is not None and not requested:
+        on_token(result)
+    return result
+
+def stream_chat_completion(
+    client: OpenAI,
+    messages: List[dict],
+    model: str,
+    on_token: Callable[[str], None],
+    **params
+) -> str:
+    """
+    以串流方式呼叫聊天完成，每收到一段文字就以該段呼叫 on_token，回傳完整結果
+    不經過快取與檢查點；由 create_chat_completion 在單一執行者中呼叫
+    """
+    estimated = sum(estimate_tokens(message["content"]) for message in messages) + CHAT_OUTPUT_TOKENS_ESTIMATE
+    parts = []
+    usage = None
+    # 重試只涵蓋建立串流；開始收到內容後中斷則直接拋出，避免重複輸出
+    stream = call_with_backoff(
+        client, "chat",
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **params
+        ),
+        tokens=estimated
     )
+    try:
+        for event in stream:
+            if event.usage:
+                usage = event.usage
+            if event.choices and event.choices[0].delta.content:
+                parts.append(event.choices[0].delta.content)
+                on_token(event.choices[0].delta.content)
+    finally:
+        stream.close()
+        get_rate_limiter(client, "chat").settle(estimated, usage.total_tokens if usage else estimated)
+
+    if usage is not None:
+        record_tokens(model, usage.prompt_tokens, usage.completion_tokens)
+    return "".join(parts).strip()
+
+def _upload_size(audio_file) -> Optional[int]:
+    """取得上傳內容大小；audio_file 可為 (檔名, 位元組) 或檔案物件"""
+    if isinstance(audio_file, tuple):
+        return len(audio_file[1])
+    try:
+        return os.fstat(audio_file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def create_transcription(
+    client: OpenAI,
+    audio_file,
+    model: str = TRANSCRIBE_MODEL,
+    language: str = TRANSCRIBE_LANGUAGE
+) -> str:
+    with timed("whisper") as span:
+        span["bytes_in"] = _upload_size(audio_file)
+        transcription = call_with_backoff(
+            client, "whisper",
+            lambda: client.audio.transcriptions.create(
+                model=model,
+                file=audio_file,
+                language=language
+            )
+        )
     return transcription.text
+
+def create_transcription_segments(
+    client: OpenAI,
+    audio_file,
+    model: str = TRANSCRIBE_MODEL,
+    language: str = TRANSCRIBE_LANGUAGE
+) -> Tuple[str, List[Tuple[float, float, str]]]:
+    """轉錄並取得片段層級的時間戳，回傳 (文字, [(開始秒, 結束秒, 文字), ...])"""
+    with timed("whisper") as span:
+        span["bytes_in"] = _upload_size(audio_file)
+        transcription = call_with_backoff(
+            client, "whisper",
+            lambda: client.audio.transcriptions.create(
+                model=model,
+                file=audio_file,
+                language=language,
+                response_format="verbose_json",
+                timestamp_granularities=["segment"]
+            )
+        )
+    segments = [
+        (segment.start, segment.end, segment.text)
+        for segment in (transcription.segments or [])
+    ]
+    return transcription.text, segments
@@ -0,0 +1,134 @@
+from typing import Callable, Iterable, Optional, Tuple
+from .pipeline import Pipeline, Stage
+from .text_processor import process_text, translate_in_chunks, summarize_text
+from .transcriber import transcribe_chunks
+from .audio_stream import stream_audio_chunks
+from .segment_store import SegmentStore
+from .artifacts import ArtifactStore
+from .checkpoint import RunManifest, compute_run_id
+from .speech_trim import OffsetMap, SilenceTrimmer
+from config.settings import (
+    TEXT_WORKERS, TRANSCRIBE_WORKERS, CHAT_MODEL, CHUNK_SIZE, CHUNK_TOLERANCE,
+    AUDIO_CODEC, AUDIO_SAMPLE_RATE, TRANSCRIBE_MODEL, TRANSCRIBE_LANGUAGE,
+    TRIM_SILENCE, SILENCE_THRESHOLD_DB, MIN_SILENCE_MS, SILENCE_PADDING_MS
+)
+
+def audio_run_id(source) -> Optional[str]:
+    """以音檔內容與影響轉錄結果的設定產生檢查點編號"""
+    return compute_run_id(
+        source,
+        chunk_size=CHUNK_SIZE,
+        chunk_tolerance=CHUNK_TOLERANCE,
+        codec=AUDIO_CODEC,
+        sample_rate=AUDIO_SAMPLE_RATE,
+        model=TRANSCRIBE_MODEL,
+        language=TRANSCRIBE_LANGUAGE,
+        trim=[SILENCE_THRESHOLD_DB, MIN_SILENCE_MS, SILENCE_PADDING_MS] if TRIM_SILENCE else None
+    )
+
+def make_trimmer() -> Optional[SilenceTrimmer]:
+    """依設定建立靜音裁剪器；停用時回傳 None"""
+    return SilenceTrimmer() if TRIM_SILENCE else None
+
+def build_text_pipeline(
+    client,
+    max_workers: int = TEXT_WORKERS,
+    manifest: Optional[RunManifest] = None,
+    on_token: Optional[Callable[[str, str], None]] = None
+) -> Pipeline:
+    """
+    轉錄後的文字處理管線
+    中文翻譯與摘要互不相依，會並行執行；重點整理在摘要完成後執行
+    提供 manifest 時，翻譯區塊與各層摘要完成即寫入檢查點
+    提供 on_token 時，各階段的模型輸出以 (階段名稱, 文字片段) 串流回報
+    """
+    def stream(name: str) -> Optional[Callable[[str], None]]:
+        if on_token is None:
+            return None
+        return lambda token: on_token(name, token)
+
+    return Pipeline([
+        Stage(
+            'summary_en',
+            lambda transcript, system_prompt, model: process_text(client, transcript, system_prompt, model, manifest=manifest, on_token=stream('summary_en')),
+            ('transcript', 'system_prompt', 'model')
+        ),
+        Stage(
+            'translation_zh',
+            lambda transcript, system_prompt, model: translate_in_chunks(client, transcript, system_prompt, model=model, manifest=manifest, on_token=stream('translation_zh')),
+            ('transcript', 'system_prompt', 'model')
+        ),
+        Stage(
+            'key_points',
+            lambda summary, system_prompt, model: "\n".join(summarize_text(client, summary, system_prompt, model, manifest=manifest, on_token=stream('key_points'))),
+            ('summary_en', 'system_prompt', 'model')
+        ),
+    ], max_workers=max_workers)
+
+def process_audio_source(
+    client,
+    source,
+    system_prompt: str = "",
+    model: str = CHAT_MODEL,
+    max_workers: int = TRANSCRIBE_WORKERS,
+    on_stage: Optional[Callable[..., None]] = None,
+    manifest: Optional[RunManifest] = None,
+    chunks: Optional[Iterable[Tuple[int, object]]] = None,
+    on_token: Optional[Callable[[str, str], None]] = None,
+    offsets: Optional[OffsetMap] = None
+) -> dict:
+    """
+    不依賴 UI 的完整處理流程：串流解碼與轉錄、翻譯與摘要、雙語字幕
+    on_stage 以 (階段名稱, 狀態, **進度) 呼叫，供背景工作回報進度
+    提供 manifest 時從檢查點繼續，已完成的片段與階段不再重做
+    chunks 為已切割（或已編碼）的 (位移毫秒, 片段)，提供時不再解碼 source；
+    若這些片段已移除靜音，offsets 為對應的 OffsetMap（須在 chunks 產生完畢後才完整）
+    on_token 以 (階段名稱, 文字片段) 串流回報翻譯與摘要的模型輸出
+    """
+    report = on_stage or (lambda name, status, **details: None)
+
+    report('transcribe', 'running', completed=0)
+    progress = {'completed': 0, 'total': None}
+
+    def on_progress(done: int, total: Optional[int]):
+        progress.update(completed=done, total=total)
+        report('transcribe', 'running', completed=done, total=total)
+    segments = SegmentStore()
+    if chunks is None:
+        trimmer = make_trimmer()
+        offsets = trimmer.offsets if trimmer is not None else None
+        chunks = stream_audio_chunks(source, trimmer=trimmer)
+    transcript = transcribe_chunks(
+        client, chunks, max_workers=max_workers,
+        on_progress=on_progress,
+        segments=segments,
+        manifest=manifest
+    )
+    trim = None
+    if offsets is not None:
+        # 轉錄的時間戳是裁剪後的時間，換回原始時間軸供字幕使用
+        segments.remap(offsets)
+        trim = offsets.to_dict()
+    # completed 與執行中的回報一致為片段數；時間戳片段數另以 segments 回報
+    report(
+        'transcribe', 'done', completed=progress['completed'], total=progress['completed'],
+        segments=len(segments), duration=segments.duration, speech_trim=trim
+    )
+
+    pipeline = build_text_pipeline(client, manifest=manifest, on_token=on_token)
+    for name in pipeline.stages:
+        report(name, 'pending')
+    results = pipeline.run(
+        {'transcript': transcript, 'system_prompt': system_prompt, 'model': model},
+        memo=manifest.stage_memo() if manifest is not None else None,
+        on_stage_done=lambda name, cached: report(name, 'done', cached=cached)
+    )
+
+    report('subtitles', 'running')
+    results['segments'] = segments
+    results['speech_trim'] = trim
+    # 產出檔依內容雜湊記住，之後下載同一份字幕不會重新產生
+    results['artifacts'] = ArtifactStore.from_results(results)
+    results['srt_content'] = results['artifacts'].text('bilingual_srt')
+    report('subtitles', 'done')
+    return results
@@ -0,0 +1,89 @@
+from typing import Dict, Optional
+import threading
+import time
+
+class TokenBucket:
+    """
+    權杖桶：每分鐘補充 rate_per_minute 個權杖，最多累積 capacity 個
+    acquire 會阻塞到權杖足夠為止，並回傳等待的秒數
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount: float):
+        """依實際用量修正：正數代表多扣除，負數代表退還"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def pause(self, seconds: float):
+        """收到 429 時清空權杖，讓所有呼叫者一起等待 seconds 秒"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+class RateLimiter:
+    """每分鐘請求數（RPM）與每分鐘 token 數（TPM）的組合限制，並統計節流等待時間"""
+
+    def __init__(self, rpm: float, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.retries = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        waited = self.requests.acquire(1)
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        if waited:
+            with self._lock:
+                self.throttled_seconds += waited
+
+    def settle(self, estimated: int, actual: int):
+        """以實際 token 用量修正預估值"""
+        if self.tokens is not None and actual:
+            self.tokens.adjust(actual - estimated)
+
+    def record_retry(self, delay: float, rate_limited: bool):
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+            if rate_limited:
+                self.rate_limited += 1
+        if rate_limited:
+            self.requests.pause(delay)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+            }
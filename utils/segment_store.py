@@ -0,0 +1,93 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, Tuple
+import hashlib
+import numpy as np
+
+class SegmentStore:
+    """
+    以平行陣列保存帶時間戳的逐字稿片段
+    starts / ends 為秒數，文字以 UTF-8 連續存放在單一緩衝區，片段之間以空白分隔
+    text_offsets 為位元組位移、char_offsets 為字元位移（各比片段數多一個結尾位置）
+    """
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.text_offsets = array('q', [0])
+        self.char_offsets = array('q', [0])
+        self._buffer = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def append(self, start: float, end: float, text: str):
+        text = text.strip()
+        if not text:
+            return
+        data = (text + ' ').encode('utf-8')
+        self.starts.append(start)
+        self.ends.append(end)
+        self._buffer.extend(data)
+        self.text_offsets.append(len(self._buffer))
+        self.char_offsets.append(self.char_offsets[-1] + len(text) + 1)
+
+    def extend(self, segments: Iterable[Tuple[float, float, str]], offset: float = 0.0):
+        """加入一批片段，offset 為該批片段在原始音頻中的起始秒數"""
+        for start, end, text in segments:
+            self.append(start + offset, end + offset, text)
+
+    def segment_text(self, index: int) -> str:
+        return self._buffer[self.text_offsets[index]:self.text_offsets[index + 1]].decode('utf-8').rstrip()
+
+    def __getitem__(self, index: int) -> Tuple[float, float, str]:
+        if index < 0:
+            index += len(self)
+        return self.starts[index], self.ends[index], self.segment_text(index)
+
+    def __iter__(self) -> Iterator[Tuple[float, float, str]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def text(self) -> str:
+        """完整逐字稿，片段以空白連接"""
+        return self._buffer.decode('utf-8').rstrip()
+
+    @property
+    def duration(self) -> float:
+        return self.ends[-1] if len(self) else 0.0
+
+    def time_at(self, char_position: int) -> float:
+        """將逐字稿中的字元位置換算為音頻時間，在所屬片段內依字元比例內插"""
+        if not len(self):
+            return 0.0
+        index = min(max(bisect_right(self.char_offsets, char_position) - 1, 0), len(self) - 1)
+        begin, finish = self.char_offsets[index], self.char_offsets[index + 1]
+        ratio = min(max((char_position - begin) / max(1, finish - begin), 0.0), 1.0)
+        return self.starts[index] + (self.ends[index] - self.starts[index]) * ratio
+
+    def remap(self, offsets):
+        """以 OffsetMap 將所有時間戳換回原始時間軸（向量化，就地修改）"""
+        if not len(self):
+            return
+        starts = np.frombuffer(self.starts, dtype=np.float64)
+        ends = np.frombuffer(self.ends, dtype=np.float64)
+        starts[:] = offsets.to_original(starts.copy())
+        ends[:] = offsets.to_original(ends.copy(), end=True)
+
+    def digest(self) -> str:
+        """內容雜湊：時間戳與文字相同的片段集合得到相同的值"""
+        h = hashlib.sha256()
+        for data in (self.starts, self.ends, self.text_offsets, self._buffer):
+            h.update(memoryview(data).cast('B'))
+        return h.hexdigest()
+
+    def to_list(self) -> list:
+        return [list(segment) for segment in self]
+
+    @classmethod
+    def from_list(cls, segments: Iterable) -> "SegmentStore":
+        store = cls()
+        store.extend(segments)
+        return store
@@ -0,0 +1,159 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Union
+import numpy as np
+from .chunk_planner import frame_energy
+from config.settings import (
+    AUDIO_SAMPLE_RATE, ENERGY_FRAME_MS, SILENCE_THRESHOLD_DB, MIN_SILENCE_MS, SILENCE_PADDING_MS
+)
+
+SAMPLE_WIDTH = 2  # 16-bit 單聲道 PCM
+FULL_SCALE = 32768.0 ** 2
+
+class OffsetMap:
+    """
+    裁剪後時間軸到原始時間軸的分段平移
+    每個斷點 (裁剪後秒數, 原始秒數) 之後到下一個斷點之間，兩條時間軸等速前進
+    """
+
+    def __init__(self):
+        self.trimmed = array('d', [0.0])
+        self.original = array('d', [0.0])
+        self.original_duration = 0.0
+        self.trimmed_duration = 0.0
+
+    def add(self, trimmed: float, original: float):
+        """在裁剪後的 trimmed 秒處，原始時間軸跳到 original 秒"""
+        if trimmed == self.trimmed[-1]:
+            self.original[-1] = original
+        else:
+            self.trimmed.append(trimmed)
+            self.original.append(original)
+
+    def to_original(self, times: Union[float, np.ndarray], end: bool = False) -> Union[float, np.ndarray]:
+        """
+        將裁剪後的秒數換回原始時間軸；可傳入單一數值或陣列
+        end 為 True 時，落在斷點上的時間歸屬前一段（用於片段結束時間，避免跨過被移除的靜音）
+        """
+        if np.ndim(times) == 0:
+            index = (bisect_left if end else bisect_right)(self.trimmed, times) - 1
+            index = max(index, 0)
+            return self.original[index] + (times - self.trimmed[index])
+        trimmed = np.frombuffer(self.trimmed, dtype=np.float64)
+        original = np.frombuffer(self.original, dtype=np.float64)
+        index = np.maximum(np.searchsorted(trimmed, times, side='left' if end else 'right') - 1, 0)
+        return original[index] + (times - trimmed[index])
+
+    def discard_before(self, trimmed: float):
+        """捨棄 trimmed 秒之前已不再需要的斷點，讓長時間的即時轉錄記憶體用量固定"""
+        index = bisect_right(self.trimmed, trimmed) - 1
+        if index > 0:
+            del self.trimmed[:index]
+            del self.original[:index]
+
+    @property
+    def removed_seconds(self) -> float:
+        return max(0.0, self.original_duration - self.trimmed_duration)
+
+    @property
+    def removed_fraction(self) -> float:
+        return self.removed_seconds / self.original_duration if self.original_duration else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "original_seconds": round(self.original_duration, 3),
+            "trimmed_seconds": round(self.trimmed_duration, 3),
+            "removed_fraction": round(self.removed_fraction, 4),
+        }
+
+class SilenceTrimmer:
+    """
+    串流移除長靜音：以向量化方式計算每個音框的能量，低於門檻的音框視為非語音
+    連續非語音超過 min_silence_ms 時移除，只在前後各保留 padding_ms 作為緩衝
+    依序呼叫 feed() 傳入 16-bit 單聲道 PCM，取得裁剪後的 PCM；結束時呼叫 flush()
+    offsets 記錄裁剪後到原始時間軸的對應
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        frame_ms: int = ENERGY_FRAME_MS,
+        threshold_db: float = SILENCE_THRESHOLD_DB,
+        min_silence_ms: int = MIN_SILENCE_MS,
+        padding_ms: int = SILENCE_PADDING_MS
+    ):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, sample_rate * frame_ms // 1000)
+        self.frame_bytes = self.frame_len * SAMPLE_WIDTH
+        self.min_silence = max(1, min_silence_ms // frame_ms)
+        self.padding = min(padding_ms // frame_ms, self.min_silence // 2)
+        self.threshold = FULL_SCALE * 10 ** (threshold_db / 10)
+        self.offsets = OffsetMap()
+        self._remainder = b""
+        self._held = bytearray()  # 目前這段靜音中尚未輸出的音框
+        self._silent = 0  # 目前這段靜音的音框數
+        self._dropping = False  # 目前這段靜音已確定要移除中間部分
+        self._position = 0  # 已讀取的原始樣本數
+        self._emitted = 0  # 已輸出的樣本數
+
+    def _emit(self, out: bytearray, data):
+        out.extend(data)
+        self._emitted += len(data) // SAMPLE_WIDTH
+
+    def _silence(self, out: bytearray, block: bytes, frames: int):
+        pad_bytes = self.padding * self.frame_bytes
+        self._silent += frames
+        if self._dropping:
+            self._held.extend(block)
+            del self._held[:max(0, len(self._held) - pad_bytes)]
+            return
+        self._held.extend(block)
+        if self._silent >= self.min_silence:
+            # 靜音夠長：輸出開頭的緩衝，之後只保留結尾的緩衝給下一段語音
+            self._emit(out, self._held[:pad_bytes])
+            del self._held[:max(pad_bytes, len(self._held) - pad_bytes)]
+            self._dropping = True
+
+    def _end_silence(self, out: bytearray):
+        if self._dropping:
+            resume = self._position - len(self._held) // SAMPLE_WIDTH
+            self.offsets.add(self._emitted / self.sample_rate, resume / self.sample_rate)
+        self._emit(out, self._held)
+        self._held = bytearray()
+        self._silent = 0
+        self._dropping = False
+
+    def feed(self, pcm: bytes) -> bytes:
+        data = self._remainder + pcm
+        n_frames = len(data) // self.frame_bytes
+        self._remainder = data[n_frames * self.frame_bytes:]
+        out = bytearray()
+        if n_frames == 0:
+            return bytes(out)
+
+        samples = np.frombuffer(data, dtype=np.int16, count=n_frames * self.frame_len)
+        speech = frame_energy(samples, 1, self.frame_len) > self.threshold
+        # 以狀態改變的位置切出連續的語音／非語音區段，逐段處理而非逐音框
+        changes = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+        bounds = np.concatenate(([0], changes, [n_frames]))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            block = data[start * self.frame_bytes:end * self.frame_bytes]
+            if speech[start]:
+                self._end_silence(out)
+                self._emit(out, block)
+            else:
+                self._silence(out, block, int(end - start))
+            self._position += int(end - start) * self.frame_len
+        self.offsets.original_duration = self._position / self.sample_rate
+        self.offsets.trimmed_duration = self._emitted / self.sample_rate
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        out = bytearray()
+        self._end_silence(out)
+        self._emit(out, self._remainder)
+        self._position += len(self._remainder) // SAMPLE_WIDTH
+        self._remainder = b""
+        self.offsets.original_duration = self._position / self.sample_rate
+        self.offsets.trimmed_duration = self._emitted / self.sample_rate
+        return bytes(out)
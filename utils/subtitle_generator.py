@@ -1,5 +1,9 @@
-from typing import List, Tuple
+from typing import IO, Iterator, List, Optional, Tuple
 import datetime
+from .segment_store import SegmentStore
+from .metrics import instrument
+from .alignment import align_sentences
+from .text_chunker import split_sentences
 
 def create_subtitle_timestamps(text: str, words_per_line: int = 10) -> List[Tuple[float, float, str]]:
     """
@@ -24,6 +28,29 @@ def format_time(seconds: float) -> str:
     milliseconds = int((time.total_seconds() % 1) * 1000)
     return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
 
+def format_vtt_time(seconds: float) -> str:
+    """將秒數轉換為 WebVTT 時間格式"""
+    return format_time(seconds).replace(',', '.')
+
+@instrument("subtitles")
+def iter_srt(segments: SegmentStore) -> Iterator[str]:
+    """逐一產生 SRT 字幕區塊，不需在記憶體中組出整份文件"""
+    for index, (start, end, text) in enumerate(segments, 1):
+        yield f"{index}\n{format_time(start)} --> {format_time(end)}\n{text}\n\n"
+
+@instrument("subtitles")
+def iter_vtt(segments: SegmentStore) -> Iterator[str]:
+    """逐一產生 WebVTT 字幕區塊"""
+    yield "WEBVTT\n\n"
+    for start, end, text in segments:
+        yield f"{format_vtt_time(start)} --> {format_vtt_time(end)}\n{text}\n\n"
+
+def write_subtitles(segments: SegmentStore, fp: IO[str], fmt: str = "srt"):
+    """以串流方式將字幕寫入檔案物件，fmt 為 srt 或 vtt"""
+    cues = iter_vtt(segments) if fmt == "vtt" else iter_srt(segments)
+    for cue in cues:
+        fp.write(cue)
+
 def split_sentence(sentence: str, max_length: int = 75) -> List[str]:
     """將長句子分割成較短的片段"""
     if len(sentence) <= max_length:
@@ -49,21 +76,54 @@ def split_sentence(sentence: str, max_length: int = 75) -> List[str]:
     
     return lines
 
-def create_bilingual_srt(english_text: str, chinese_text: str, max_length: int = 75) -> str:
-    """創建雙語字幕文件，限制每行長度"""
-    # 分割文本為句子
-    english_sentences = [s.strip() for s in english_text.split('.') if s.strip()]
-    chinese_sentences = [s.strip() for s in chinese_text.split('。') if s.strip()]
-    
-    # 確保兩個列表長度相同
-    min_len = min(len(chinese_sentences), len(english_sentences))
-    chinese_sentences = chinese_sentences[:min_len]
-    english_sentences = english_sentences[:min_len]
+def _sentence_spans(text: str, sentences: List[str]) -> List[Tuple[int, int]]:
+    """找出每個句子在原文中的字元範圍"""
+    spans = []
+    cursor = 0
+    for sentence in sentences:
+        start = text.find(sentence, cursor)
+        if start < 0:
+            start = cursor
+        cursor = start + len(sentence)
+        spans.append((start, cursor))
+    return spans
+
+def iter_bilingual_srt(
+    english_text: str,
+    chinese_text: str,
+    max_length: int = 75,
+    segments: Optional[SegmentStore] = None
+) -> Iterator[str]:
+    """
+    逐一產生雙語字幕區塊，限制每行長度
+    提供 segments 時，依英文句子在逐字稿中的位置換算實際時間；否則每個字幕顯示 3 秒
+    """
+    # 分割文本為句子，再以句子長度對齊兩種語言；句數不同時合併或略過，不會截斷內容
+    english_sentences = split_sentences(english_text)
+    chinese_sentences = split_sentences(chinese_text)
+    sentence_spans = _sentence_spans(english_text, english_sentences)
+    pairs = []  # [(英文, 中文, 英文字元範圍)]
+    leading = ''  # 出現在第一句英文之前、只有中文的內容
+    for (en_start, en_end), (ch_start, ch_end) in align_sentences(english_sentences, chinese_sentences):
+        ch = ''.join(chinese_sentences[ch_start:ch_end])
+        if en_start == en_end:
+            # 只有中文的區塊沒有對應的時間，併入前一個（或第一個）字幕
+            if pairs:
+                pairs[-1][1] += ch
+            else:
+                leading += ch
+            continue
+        en = ' '.join(english_sentences[en_start:en_end])
+        span = (sentence_spans[en_start][0], sentence_spans[en_end - 1][1])
+        pairs.append([en, leading + ch, span])
+        leading = ''
+    if leading:
+        # 沒有任何英文句子時，中文內容單獨成為一個字幕，涵蓋整段逐字稿的時間
+        pairs.append(['', leading, (0, len(english_text))])
     
-    srt_content = []
     subtitle_index = 1
     
-    for en, ch in zip(english_sentences, chinese_sentences):
+    for en, ch, (span_start, span_end) in pairs:
         # 分割長句子
         en_parts = split_sentence(en, max_length)
         ch_parts = split_sentence(ch, max_length)
@@ -73,27 +133,44 @@ def create_bilingual_srt(english_text: str, chinese_text: str, max_length: int =
         en_parts.extend([''] * (max_parts - len(en_parts)))
         ch_parts.extend([''] * (max_parts - len(ch_parts)))
         
+        if segments is not None and len(segments):
+            sentence_start = segments.time_at(span_start)
+            sentence_end = max(segments.time_at(span_end), sentence_start + 0.5)
+        
         # 為每個部分創建字幕
-        for en_part, ch_part in zip(en_parts, ch_parts):
+        for part_index, (en_part, ch_part) in enumerate(zip(en_parts, ch_parts)):
             if not en_part and not ch_part:
                 continue
-                
-            start_time = (subtitle_index - 1) * 3
-            end_time = start_time + 3
             
-            start_stamp = f"{int(start_time//3600):02d}:{int((start_time%3600)//60):02d}:{int(start_time%60):02d},000"
-            end_stamp = f"{int(end_time//3600):02d}:{int((end_time%3600)//60):02d}:{int(end_time%60):02d},000"
+            if segments is not None and len(segments):
+                # 依句子實際時間平均分配給各部分
+                step = (sentence_end - sentence_start) / max_parts
+                start_time = sentence_start + step * part_index
+                end_time = start_time + step
+            else:
+                start_time = (subtitle_index - 1) * 3
+                end_time = start_time + 3
             
             # 添加適當的標點
             en_part = en_part.strip()
             ch_part = ch_part.strip()
             
-            if en_part and not en_part.endswith(('.', '!', '?')):
+            if en_part and not en_part.endswith(('.', '!', '?', ';')):
                 en_part += '.'
-            if ch_part and not ch_part.endswith('。'):
+            if ch_part and not ch_part.endswith(('。', '！', '？', '；')):
                 ch_part += '。'
             
-            srt_content.append(f"{subtitle_index}\n{start_stamp} --> {end_stamp}\n{en_part}\n{ch_part}\n\n")
+            # 空行會提前結束字幕區塊，因此只寫入有內容的語言
+            text = '\n'.join(part for part in (en_part, ch_part) if part)
+            yield f"{subtitle_index}\n{format_time(start_time)} --> {format_time(end_time)}\n{text}\n\n"
             subtitle_index += 1
-    
-    return ''.join(srt_content) 
\ No newline at end of file
+
+@instrument("bilingual_srt")
+def create_bilingual_srt(
+    english_text: str,
+    chinese_text: str,
+    max_length: int = 75,
+    segments: Optional[SegmentStore] = None
+) -> str:
+    """創建雙語字幕文件，限制每行長度"""
+    return ''.join(iter_bilingual_srt(english_text, chinese_text, max_length, segments))
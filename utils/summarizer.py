@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from .openai_client import create_chat_completion
+from .text_chunker import chunk_text, estimate_tokens
+from config.settings import (
+    SUMMARY_DIRECT_TOKENS, SUMMARY_SECTION_TOKENS, SUMMARY_FAN_IN, SUMMARY_MAP_MODEL, TEXT_WORKERS
+)
+
+def summarize_section(client, text: str, system_prompt: str, model: str = SUMMARY_MAP_MODEL, manifest=None) -> str:
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Summarize the following section of a longer transcript. Keep all key facts, numbers and terminology: {text}"}
+    ]
+    return create_chat_completion(client, messages, model, manifest=manifest)
+
+def merge_summaries(client, summaries: List[str], system_prompt: str, model: str = SUMMARY_MAP_MODEL, manifest=None) -> str:
+    joined = "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Combine the following summaries of consecutive parts of one transcript into a single coherent summary. Keep all key facts, numbers and terminology:\n\n{joined}"}
+    ]
+    return create_chat_completion(client, messages, model, manifest=manifest)
+
+def condense_text(
+    client,
+    text: str,
+    system_prompt: str,
+    model: str = SUMMARY_MAP_MODEL,
+    direct_tokens: int = SUMMARY_DIRECT_TOKENS,
+    section_tokens: int = SUMMARY_SECTION_TOKENS,
+    fan_in: int = SUMMARY_FAN_IN,
+    max_workers: int = TEXT_WORKERS,
+    manifest=None
+) -> str:
+    """
+    將過長的逐字稿以階層式 map-reduce 濃縮到可放入單一提示的長度
+    先並行摘要每個分段，再每 fan_in 個合併一次，直到總長度低於 direct_tokens
+    分段與分組都從開頭依序決定，且每次呼叫都經過聊天完成快取；
+    逐字稿在尾端增加內容時，只有最後一個分段與其上層的合併節點需要重新計算
+    """
+    if estimate_tokens(text) <= direct_tokens:
+        return text
+
+    fan_in = max(2, fan_in)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        level = list(executor.map(
+            lambda section: summarize_section(client, section, system_prompt, model, manifest),
+            chunk_text(text, section_tokens)
+        ))
+        while len(level) > 1 and sum(estimate_tokens(summary) for summary in level) > direct_tokens:
+            groups = [level[i:i + fan_in] for i in range(0, len(level), fan_in)]
+            level = list(executor.map(
+                lambda group: group[0] if len(group) == 1 else merge_summaries(client, group, system_prompt, model, manifest),
+                groups
+            ))
+
+    return "\n\n".join(level)
@@ -0,0 +1,86 @@
+from typing import Iterator, List, Optional
+import re
+
+try:
+    import tiktoken
+except ImportError:  # 未安裝時使用估算值
+    tiktoken = None
+
+# 句子：到終止符號（含其後的引號或括號）為止；換行也視為句子邊界
+SENTENCE_PATTERN = re.compile(r'[^.!?。！？；\n]+(?:[.!?。！？；]+["\'”’)）」』]*)?|[.!?。！？；]+')
+CJK_PATTERN = re.compile(r'[　-〿㐀-䶿一-鿿豈-﫿＀-￯]')
+
+# 估算值：中日韓字元約 1 token，其餘文字約 4 個字元 1 token
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+
+def _encoding(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    key = model or ''
+    if key not in _encodings:
+        try:
+            _encodings[key] = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encodings[key] = None
+    return _encodings[key]
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """計算文字的 token 數；有安裝 tiktoken 時精確計算，否則使用估算值"""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + -(-(len(text) - cjk) // CHARS_PER_TOKEN)
+
+def split_sentences(text: str) -> List[str]:
+    """以中英文句號、問號、驚嘆號、分號與換行切分句子，保留標點"""
+    return [m.group().strip() for m in SENTENCE_PATTERN.finditer(text) if m.group().strip()]
+
+def _split_oversized(sentence: str, max_tokens: int, model: Optional[str]) -> Iterator[str]:
+    """把超過預算的單一句子依字詞（中文依字元）切開"""
+    units = sentence.split() if ' ' in sentence else list(sentence)
+    joiner = ' ' if ' ' in sentence else ''
+    piece: List[str] = []
+    tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit, model) + (1 if joiner else 0)
+        if piece and tokens + unit_tokens > max_tokens:
+            yield joiner.join(piece)
+            piece, tokens = [], 0
+        piece.append(unit)
+        tokens += unit_tokens
+    if piece:
+        yield joiner.join(piece)
+
+def pack_sentences(
+    sentences: List[str],
+    max_tokens: int,
+    model: Optional[str] = None,
+    joiner: str = ' '
+) -> List[str]:
+    """依序將完整句子裝入不超過 max_tokens 的區塊，線性時間"""
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in sentences:
+        tokens = estimate_tokens(sentence, model) + 1
+        if tokens > max_tokens:
+            parts = list(_split_oversized(sentence, max_tokens, model))
+        else:
+            parts = [sentence]
+        for part in parts:
+            part_tokens = tokens if len(parts) == 1 else estimate_tokens(part, model) + 1
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append(joiner.join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        chunks.append(joiner.join(current))
+    return chunks
+
+def chunk_text(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """將文字切成句子後，以最少的區塊數裝入 token 預算"""
+    return pack_sentences(split_sentences(text), max_tokens, model)
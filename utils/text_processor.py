@@ -1,28 +1,148 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import threading
 from .openai_client import create_chat_completion
-from config.settings import MAX_TEXT_LENGTH
+from .text_chunker import chunk_text
+from .summarizer import condense_text
+from config.settings import MAX_TEXT_TOKENS, CHAT_MODEL, TEXT_WORKERS, TRANSLATE_CHUNK_TOKENS, SUMMARY_MAP_MODEL
 
-def split_text(text: str, max_length: int = MAX_TEXT_LENGTH) -> List[str]:
-    return [text[i:i + max_length] for i in range(0, len(text), max_length)]
+def split_text(text: str, max_tokens: int = MAX_TEXT_TOKENS, model: str = CHAT_MODEL) -> List[str]:
+    """以完整句子切分文字，每段不超過 max_tokens"""
+    return chunk_text(text, max_tokens, model)
 
-def process_text(client, text: str, system_prompt: str) -> str:
+def process_text(
+    client,
+    text: str,
+    system_prompt: str,
+    model: str = CHAT_MODEL,
+    map_model: str = SUMMARY_MAP_MODEL,
+    manifest=None,
+    on_token: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    產生 500 字摘要；過長的逐字稿先以 map-reduce 濃縮
+    提供 on_token 時，最後一次摘要以串流方式逐段回報
+    """
+    text = condense_text(client, text, system_prompt, map_model, manifest=manifest)
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"Please summarize the following text in 500 words as detail as you can in zh-tw: {text}"}
     ]
-    return create_chat_completion(client, messages)
+    return create_chat_completion(client, messages, model, manifest=manifest, on_token=on_token)
 
-def translate_text(client, text: str, system_prompt: str, to_language: str = "zh-tw") -> str:
+def translate_text(
+    client,
+    text: str,
+    system_prompt: str,
+    to_language: str = "zh-tw",
+    model: str = CHAT_MODEL,
+    manifest=None,
+    on_token: Optional[Callable[[str], None]] = None
+) -> str:
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"Translate the following English text to {to_language}: {text}"}
     ]
-    return create_chat_completion(client, messages)
+    return create_chat_completion(client, messages, model, manifest=manifest, on_token=on_token)
 
-def summarize_text(client, text: str, system_prompt: str) -> List[str]:
+def translate_in_chunks(
+    client,
+    text: str,
+    system_prompt: str,
+    max_tokens: int = TRANSLATE_CHUNK_TOKENS,
+    model: str = CHAT_MODEL,
+    max_workers: int = TEXT_WORKERS,
+    manifest=None,
+    on_token: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    依 token 預算將完整句子分塊，並行翻譯後依原始順序合併
+    提供 manifest 時每個翻譯區塊完成即記錄，中斷後只需翻譯未完成的區塊
+    提供 on_token 時依原始順序串流回報：第一個未完成的區塊即時輸出，後面區塊先暫存
+    """
+    chunks = chunk_text(text, max_tokens, model)
+    stream = _OrderedStream(on_token, len(chunks), '\n\n') if on_token is not None else None
+
+    def translate(index: int, chunk: str) -> str:
+        if stream is None:
+            return translate_text(client, chunk, system_prompt, model=model, manifest=manifest)
+        result = translate_text(
+            client, chunk, system_prompt, model=model, manifest=manifest,
+            on_token=lambda token: stream.token(index, token)
+        )
+        stream.done(index)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        translated_chunks = list(executor.map(translate, range(len(chunks)), chunks))
+    
+    return '\n\n'.join(translated_chunks)
+
+class _OrderedStream:
+    """將並行產生的多段串流依索引順序合併成單一串流"""
+
+    def __init__(self, on_token: Callable[[str], None], count: int, separator: str):
+        self.on_token = on_token
+        self.count = count
+        self.separator = separator
+        self.head = 0
+        self.buffers: Dict[int, List[str]] = {}
+        self.finished = set()
+        self._lock = threading.Lock()
+
+    def token(self, index: int, token: str):
+        with self._lock:
+            if index == self.head:
+                self.on_token(token)
+            else:
+                self.buffers.setdefault(index, []).append(token)
+
+    def done(self, index: int):
+        with self._lock:
+            self.finished.add(index)
+            while self.head in self.finished:
+                self.head += 1
+                if self.head < self.count:
+                    self.on_token(self.separator + "".join(self.buffers.pop(self.head, [])))
+
+def summarize_text(
+    client,
+    text: str,
+    system_prompt: str,
+    model: str = CHAT_MODEL,
+    map_model: str = SUMMARY_MAP_MODEL,
+    manifest=None,
+    on_token: Optional[Callable[[str], None]] = None
+) -> List[str]:
+    """產生 10 點重點整理；過長的文字先以 map-reduce 濃縮"""
+    text = condense_text(client, text, system_prompt, map_model, manifest=manifest)
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"Summarize the following text into 10 key points in zh-tw: {text}"}
     ]
-    response = create_chat_completion(client, messages)
+    response = create_chat_completion(client, messages, model, manifest=manifest, on_token=on_token)
+    return response.split('\n')[:10]
+
+def update_key_points(
+    client,
+    key_points: str,
+    new_text: str,
+    system_prompt: str,
+    model: str = CHAT_MODEL,
+    on_token: Optional[Callable[[str], None]] = None
+) -> List[str]:
+    """
+    以新增的逐字稿更新既有的 10 點重點整理，不重新處理整份逐字稿（用於即時轉錄）
+    尚無重點時等同 summarize_text
+    """
+    if not key_points.strip():
+        return summarize_text(client, new_text, system_prompt, model, on_token=on_token)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": (
+            f"Here are the current 10 key points in zh-tw of an ongoing recording:\n{key_points}\n\n"
+            f"Update them with the following new transcript, keeping at most 10 key points in zh-tw: {new_text}"
+        )}
+    ]
+    response = create_chat_completion(client, messages, model, on_token=on_token)
     return response.split('\n')[:10]
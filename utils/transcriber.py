@@ -0,0 +1,142 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import json
+from .openai_client import create_transcription_segments
+from .audio_encoder import EncodedChunk, encode_chunk
+from .disk_cache import DiskCache
+from .segment_store import SegmentStore
+from .checkpoint import RunManifest
+from .metrics import record_cache
+from .transcript_cache import get_transcript_cache, transcript_cache_key
+from config.settings import (
+    TRANSCRIBE_WORKERS, TRANSCRIBE_MODEL, TRANSCRIBE_LANGUAGE, AUDIO_CODEC
+)
+
+Segment = Tuple[float, float, str]
+
+class ChunkStats(NamedTuple):
+    raw_bytes: int  # 編碼前的 PCM 大小
+    encoded_bytes: int  # 編碼後大小（快取命中時不會上傳）
+    cached: bool
+
+def transcribe_chunk(
+    client,
+    chunk,
+    codec: str = AUDIO_CODEC,
+    cache: Optional[DiskCache] = None
+) -> Tuple[str, List[Segment], ChunkStats]:
+    """
+    在記憶體中編碼並轉錄單一音頻片段；429 與暫時性錯誤只重試這個片段
+    chunk 也可以是已編碼的 EncodedChunk（例如批次處理時由解碼程序先行編碼）
+    回傳 (文字, 相對於片段開頭的時間戳片段, ChunkStats)
+    若快取中已有相同內容的片段，直接回傳快取結果而不呼叫 Whisper
+    """
+    encoded = chunk if isinstance(chunk, EncodedChunk) else encode_chunk(chunk, codec=codec)
+    key = transcript_cache_key(encoded.data, TRANSCRIBE_MODEL, TRANSCRIBE_LANGUAGE)
+    if cache is not None:
+        cached = cache.get(key)
+        record_cache("transcript", hit=cached is not None)
+        if cached is not None:
+            entry = json.loads(cached)
+            segments = [tuple(segment) for segment in entry["segments"]]
+            return entry["text"], segments, ChunkStats(encoded.raw_bytes, encoded.encoded_bytes, True)
+
+    text, segments = create_transcription_segments(client, (encoded.filename, encoded.data))
+
+    if cache is not None:
+        entry = {"text": text, "segments": segments}
+        cache.set(key, json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+    return text, segments, ChunkStats(encoded.raw_bytes, encoded.encoded_bytes, False)
+
+def transcribe_chunks(
+    client,
+    chunks: Iterable[Tuple[int, object]],
+    max_workers: int = TRANSCRIBE_WORKERS,
+    on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    codec: str = AUDIO_CODEC,
+    stats: Optional[List[ChunkStats]] = None,
+    cache: Optional[DiskCache] = None,
+    segments: Optional[SegmentStore] = None,
+    manifest: Optional[RunManifest] = None
+) -> str:
+    """
+    並行轉錄所有 (原始位移毫秒, 音頻片段)，並依原始順序重組逐字稿
+    chunks 可以是列表或產生器；產生器會邊產生邊送出，同時最多保留 2 倍 max_workers 個片段在記憶體中
+    on_progress 在呼叫端執行緒中以 (已完成數, 總數) 呼叫，可直接更新 Streamlit 元件；總數未知時為 None
+    若提供 stats，會依片段順序填入每個片段的 ChunkStats
+    若提供 segments，會依序加入已平移到原始時間軸的時間戳片段
+    cache 未指定時使用共用的逐字稿快取
+    若提供 manifest，已記錄在檢查點的片段不再編碼或轉錄，新完成的片段會立即寫入檢查點
+    """
+    if cache is None:
+        cache = get_transcript_cache()
+    total = len(chunks) if hasattr(chunks, '__len__') else None
+    max_workers = max(1, max_workers)
+    results: Dict[int, Tuple[str, List[Segment], ChunkStats]] = {}
+    offsets: Dict[int, int] = {}
+    pending: Dict[Future, int] = {}
+    texts: List[str] = []
+    completed = 0
+
+    def record(index: int, result: Tuple[str, List[Segment], ChunkStats]):
+        nonlocal completed
+        results[index] = result
+        completed += 1
+        if on_progress:
+            on_progress(completed, total)
+        # 依原始順序輸出已完成的前綴，之後的片段等待前面的完成
+        while len(texts) in results:
+            index = len(texts)
+            text, chunk_segments, chunk_stats = results.pop(index)
+            # 有時間戳時以片段文字組成逐字稿，使其與 SegmentStore.text 的字元位置一致
+            segment_texts = [segment[2].strip() for segment in chunk_segments if segment[2].strip()]
+            texts.append(" ".join(segment_texts) if segment_texts else text.strip())
+            if segments is not None:
+                segments.extend(chunk_segments, offset=offsets.pop(index) / 1000)
+            else:
+                offsets.pop(index)
+            if stats is not None:
+                stats.append(chunk_stats)
+
+    def collect():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        error = None
+        for future in done:
+            index = pending.pop(future)
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            result = future.result()
+            if manifest is not None:
+                manifest.save_chunk(index, offsets[index], result[0], result[1])
+            record(index, result)
+        # 先保存同一批中已成功的片段，再回報失敗
+        if error is not None:
+            raise error
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for i, (offset_ms, chunk) in enumerate(chunks):
+                # 限制尚未完成的片段數，避免解碼遠遠跑在轉錄前面
+                while len(pending) >= max_workers * 2:
+                    collect()
+                offsets[i] = offset_ms
+                checkpoint = manifest.get_chunk(i, offset_ms) if manifest is not None else None
+                if checkpoint is not None:
+                    record(i, (checkpoint[0], checkpoint[1], ChunkStats(0, 0, True)))
+                    continue
+                pending[executor.submit(transcribe_chunk, client, chunk, codec, cache)] = i
+            while pending:
+                collect()
+        except BaseException:
+            # 某片段重試後仍失敗或解碼中斷：取消尚未開始的片段，已在進行中的片段完成後仍寫入檢查點
+            running = [future for future in pending if not future.cancel()]
+            if manifest is not None:
+                for future in wait(running).done:
+                    if future.exception() is None:
+                        text, chunk_segments, _ = future.result()
+                        index = pending[future]
+                        manifest.save_chunk(index, offsets[index], text, chunk_segments)
+            raise
+
+    return " ".join(text for text in texts if text)
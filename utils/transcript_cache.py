@@ -0,0 +1,28 @@
+from typing import Optional
+import hashlib
+import os
+import threading
+from .disk_cache import DiskCache
+from config.settings import CACHE_DIR, TRANSCRIPT_CACHE_MAX_BYTES
+
+# 快取值為含時間戳片段的 JSON；格式改變時更新版本以避免讀到舊格式
+CACHE_FORMAT = "segments-v1"
+
+_cache: Optional[DiskCache] = None
+_cache_lock = threading.Lock()
+
+def transcript_cache_key(data: bytes, model: str, language: str) -> str:
+    """以編碼後的音頻內容、模型與語言產生快取鍵"""
+    digest = hashlib.sha256(data)
+    digest.update(f"\0{model}\0{language}\0{CACHE_FORMAT}".encode('utf-8'))
+    return digest.hexdigest()
+
+def get_transcript_cache() -> Optional[DiskCache]:
+    """取得共用的逐字稿快取；上限設為 0 時停用"""
+    global _cache
+    if TRANSCRIPT_CACHE_MAX_BYTES <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(os.path.join(CACHE_DIR, "transcripts.sqlite3"), TRANSCRIPT_CACHE_MAX_BYTES)
+        return _cache
@@ -0,0 +1,154 @@
+from typing import Dict, Optional
+import os
+import threading
+import time
+import uuid
+from config.settings import UPLOAD_DIR, UPLOAD_IDLE_TIMEOUT
+
+class UploadError(Exception):
+    """上傳位移不連續或上傳已結束"""
+
+class UploadSession:
+    """
+    可續傳的上傳：內容依位移附加到磁碟上的暫存檔
+    reader() 回傳的檔案物件可在上傳尚未完成時開始讀取，讓解碼與轉錄邊收邊做
+    """
+
+    def __init__(self, filename: str = "", total: Optional[int] = None, directory: str = UPLOAD_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.total = total
+        self.path = os.path.join(directory, self.id + os.path.splitext(filename)[1])
+        self.size = 0
+        self.complete = False
+        self.aborted = False
+        self.job_id: Optional[str] = None
+        self.updated = time.time()
+        self._file = open(self.path, "wb")
+        self._readers = []
+        self._condition = threading.Condition()
+
+    def write(self, offset: int, data: bytes) -> int:
+        """在 offset 寫入資料並回傳新的位移；與已收到內容重疊的部分會略過，以便重送"""
+        with self._condition:
+            if self.complete or self.aborted:
+                raise UploadError("上傳已結束")
+            if offset > self.size:
+                raise UploadError(f"位移不連續：已收到 {self.size} 位元組")
+            data = data[self.size - offset:]
+            if data:
+                self._file.write(data)
+                self._file.flush()
+                self.size += len(data)
+            self.updated = time.time()
+            if self.total is not None and self.size >= self.total:
+                self._finish()
+            self._condition.notify_all()
+            return self.size
+
+    def _finish(self):
+        self.complete = True
+        self._file.close()
+
+    def finish(self):
+        with self._condition:
+            if not self.complete:
+                self._finish()
+            self._condition.notify_all()
+
+    def abort(self):
+        with self._condition:
+            self.aborted = True
+            if not self._file.closed:
+                self._file.close()
+            self._condition.notify_all()
+
+    def wait_for(self, position: int, timeout: float = UPLOAD_IDLE_TIMEOUT) -> bool:
+        """等待收到超過 position 的資料；上傳完成時回傳 False"""
+        with self._condition:
+            while self.size <= position:
+                if self.complete:
+                    return False
+                if self.aborted:
+                    raise UploadError("上傳已中止")
+                if not self._condition.wait(timeout) and self.size <= position:
+                    raise TimeoutError("等待上傳資料逾時")
+            return True
+
+    def reader(self) -> "UploadReader":
+        reader = UploadReader(self)
+        self._readers.append(reader)
+        return reader
+
+    def to_dict(self) -> dict:
+        return {
+            "upload_id": self.id,
+            "offset": self.size,
+            "total": self.total,
+            "complete": self.complete,
+            "job_id": self.job_id,
+        }
+
+    def remove(self):
+        self.abort()
+        for reader in self._readers:
+            reader.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+class UploadReader:
+    """讀取仍在上傳中的檔案；讀到目前結尾時等待新資料，直到上傳完成"""
+
+    def __init__(self, session: UploadSession):
+        self.session = session
+        self.name = session.filename
+        # 內容尚未收齊無法計算雜湊，以上傳編號作為檢查點的鍵；同一上傳重新處理時從檢查點繼續
+        self.run_key = f"upload:{session.id}"
+        self._file = open(session.path, "rb")
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            data = self._file.read(size)
+            if data:
+                return data
+            if not self.session.wait_for(self._file.tell()):
+                return self._file.read(size)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+class UploadManager:
+    """管理上傳中的工作階段，並清除閒置過久的上傳"""
+
+    def __init__(self, idle_timeout: float = UPLOAD_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, filename: str = "", total: Optional[int] = None) -> UploadSession:
+        self._prune()
+        session = UploadSession(filename, total)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        with self._lock:
+            return self._sessions.get(upload_id)
+
+    def remove(self, upload_id: str):
+        with self._lock:
+            session = self._sessions.pop(upload_id, None)
+        if session is not None:
+            session.remove()
+
+    def _prune(self):
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            stale = [s for s in self._sessions.values() if s.updated < cutoff and s.job_id is None]
+        for session in stale:
+            self.remove(session.id)